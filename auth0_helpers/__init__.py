@@ -7,3 +7,8 @@
 from auth0_helpers.auth0_mgmt import (Auth0BackoffWrapper,
                                       Auth0ManagementAPIFactory, Auth0Manager,
                                       Auth0UserBuilder)
+from auth0_helpers.metadata_cache import Auth0MetadataCache, auth0_metadata_cache
+from auth0_helpers.rate_limit import Auth0RateLimiter, auth0_rate_limiter
+from auth0_helpers.user_export import Auth0ExportError
+from auth0_helpers.user_search import UserSearchPlan
+from auth0_helpers.user_sort import sort_users, top_users
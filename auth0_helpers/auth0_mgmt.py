@@ -5,38 +5,83 @@
 """
 import asyncio
 import datetime
+import functools
+import logging
+import time
 from typing import Any, AsyncIterator, Literal
 
 import aiohttp
 import auth0.authentication
 import auth0.exceptions
 import auth0.management
+import auth0.rest
 import backoff
+from auth0_helpers.metadata_cache import Auth0MetadataCache, auth0_metadata_cache
+from auth0_helpers.rate_limit import Auth0RateLimiter, auth0_rate_limiter
+from auth0_helpers.user_export import (iter_users_export, start_users_export,
+                                       wait_for_users_export)
+from auth0_helpers.user_search import UserSearchPlan
+from auth0_helpers.user_sort import sort_users, top_users
 from config import Config
 from fiftyone_helpers import Group, Organization, User, UserRole
+from migration_helpers.metrics import metrics
+from migration_helpers.sharding import shard_of
+
+logger = logging.getLogger(__name__)
 
 
 class Auth0BackoffWrapper:
-    """Wraps all instance methods in backoff when rate limiting error is hit"""
+    """Wraps all instance methods in backoff when rate limiting error is hit
+
+    Async methods also wait for the rate limiter before each request.
+    """
 
-    def __init__(self, instance):
+    def __init__(self, instance, rate_limiter: Auth0RateLimiter | None = None):
         self.__instance = instance
+        self.__rate_limiter = rate_limiter
+        self.__wrapped_attrs = {}
 
     def __getattr__(self, name):
+        if name in self.__wrapped_attrs:
+            return self.__wrapped_attrs[name]
+
         if not hasattr(self.__instance, name):
             raise AttributeError(f"'{type(self.__instance)}' object has no attribute 'name'")
 
         attr = getattr(self.__instance, name)
-        return (
-            backoff.on_exception(
-                backoff.expo,
-                (auth0.exceptions.RateLimitError),
-                max_tries=Config.MAX_HTTP_RETRIES,
-                logger=None,
-            )(attr)
-            if callable(attr)
-            else attr
-        )
+        if not callable(attr):
+            return attr
+
+        if self.__rate_limiter is not None and asyncio.iscoroutinefunction(attr):
+            attr = self.__rate_limited(attr)
+
+        wrapped = backoff.on_exception(
+            backoff.expo,
+            (auth0.exceptions.RateLimitError),
+            max_tries=Config.MAX_HTTP_RETRIES,
+            logger=None,
+            on_backoff=lambda _: metrics.increment("auth0.retries"),
+        )(attr)
+
+        self.__wrapped_attrs[name] = wrapped
+        return wrapped
+
+    def __rate_limited(self, fn):
+        rate_limiter = self.__rate_limiter
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            await rate_limiter.acquire()
+            try:
+                return await fn(*args, **kwargs)
+            except auth0.exceptions.RateLimitError as err:
+                metrics.increment("auth0.rate_limited")
+                # Hold every caller until the limit resets, not just this one.
+                if err.reset_at > 0:
+                    rate_limiter.block(err.reset_at - time.time())
+                raise
+
+        return wrapper
 
 
 class Auth0ManagementAPIFactory:
@@ -51,6 +96,7 @@ class Auth0ManagementAPIFactory:
         /,
         client_expiry: int | datetime.timedelta | None = None,
         session: aiohttp.ClientSession | None = None,
+        rate_limiter: Auth0RateLimiter | None = auth0_rate_limiter,
     ):
         self.__client_domain = client_domain
         self.__client_id = client_id
@@ -60,8 +106,12 @@ class Auth0ManagementAPIFactory:
         self.__mgmt_client: auth0.management.Auth0 = None
         self.__mgmt_client_lock = asyncio.Lock()
         self.__mgmt_client_expires_at: datetime.datetime = None
+        self.__refresh_task: asyncio.Task | None = None
 
         self.__client_session = session
+        self.__owns_client_session = False
+        self.__rate_limiter = rate_limiter
+        self.__wrapped_services: dict[str, Auth0BackoffWrapper] = {}
 
         if client_expiry is not None:
             if isinstance(client_expiry, int):  # If int it's in seconds
@@ -82,62 +132,135 @@ class Auth0ManagementAPIFactory:
         return self.__client_domain
 
     async def get_client(self) -> auth0.management.Auth0:
+        with metrics.timed("auth0.get_client"):
+            return await self.__get_client()
+
+    async def __get_client(self):
+        # Fast path without the lock while the client is valid, which is
+        # nearly always as it's refreshed in the background before expiring.
+        if self.__mgmt_client and self.__mgmt_client_expires_at > datetime.datetime.utcnow():
+            return self.__mgmt_client
+
         # Using a lock to make sure that only one accessor can refresh the
         # auth0 client at a time if it's about to expire.
         async with self.__mgmt_client_lock:
-            now = datetime.datetime.utcnow()
-
             # Set a new auth0 client if one does not exist or an existing
             # client is about to expire.
-            if not self.__mgmt_client or self.__mgmt_client_expires_at <= now:
-                get_token = auth0.authentication.GetToken(
-                    self.__client_domain,
-                    self.__client_id,
-                    client_secret=self.__client_secret,
-                )
+            if (
+                not self.__mgmt_client
+                or self.__mgmt_client_expires_at <= datetime.datetime.utcnow()
+            ):
+                await self.__refresh_client()
 
-                # Subtracting arbitrary modifier so refresh happens a little
-                # sooner with less chance of hard erroring in downstream use.
-                mgmt_token = get_token.client_credentials(self.__audience)
-                mgmt_token_expiry = datetime.timedelta(seconds=mgmt_token["expires_in"])
-                self.__mgmt_client_expires_at = (
-                    now
-                    # Use token expiry if not provided expiry or provided
-                    # expiry is bigger than token expiry.
-                    + (
-                        min(mgmt_token_expiry, self.__mgmt_client_expiry)
-                        if self.__mgmt_client_expiry is not None
-                        else mgmt_token_expiry
-                    )
-                    # small buffer to avoid hard errors
-                    - datetime.timedelta(seconds=30)
-                )
+            return self.__mgmt_client
 
-                self.__mgmt_client = auth0.management.Auth0(
-                    self.__client_domain, mgmt_token["access_token"]
-                )
+    async def close(self) -> None:
+        """Stop refreshing the client and close the client session if it was
+        created by the factory."""
+        if self.__refresh_task is not None:
+            self.__refresh_task.cancel()
+            self.__refresh_task = None
+
+        if self.__owns_client_session:
+            await self.__client_session.close()
+            self.__client_session = None
+            self.__owns_client_session = False
+
+    async def __refresh_client(self):
+        get_token = auth0.authentication.GetToken(
+            self.__client_domain,
+            self.__client_id,
+            client_secret=self.__client_secret,
+        )
 
-                if self.__client_session:
-                    self.__mgmt_client.set_session(self.__client_session)
+        # The token exchange is a blocking request, so run it off the event
+        # loop.
+        now = datetime.datetime.utcnow()
+        mgmt_token = await asyncio.to_thread(get_token.client_credentials, self.__audience)
+
+        # Subtracting arbitrary modifier so refresh happens a little
+        # sooner with less chance of hard erroring in downstream use.
+        mgmt_token_expiry = datetime.timedelta(seconds=mgmt_token["expires_in"])
+        self.__mgmt_client_expires_at = (
+            now
+            # Use token expiry if not provided expiry or provided
+            # expiry is bigger than token expiry.
+            + (
+                min(mgmt_token_expiry, self.__mgmt_client_expiry)
+                if self.__mgmt_client_expiry is not None
+                else mgmt_token_expiry
+            )
+            # small buffer to avoid hard errors
+            - datetime.timedelta(seconds=30)
+        )
 
-            return self.__mgmt_client
+        # Retries are left to `Auth0BackoffWrapper` so that they go
+        # through the rate limiter too.
+        self.__mgmt_client = auth0.management.Auth0(
+            self.__client_domain,
+            mgmt_token["access_token"],
+            rest_options=auth0.rest.RestClientOptions(retries=0),
+        )
+        self.__wrapped_services.clear()
+
+        if not self.__client_session:
+            # Reuse connections for all requests and let the rate
+            # limiter see the rate limit headers of every response.
+            trace_configs = (
+                [self.__rate_limiter.trace_config()] if self.__rate_limiter else None
+            )
+            self.__client_session = aiohttp.ClientSession(trace_configs=trace_configs)
+            self.__owns_client_session = True
+
+        self.__mgmt_client.set_session(self.__client_session)
+
+        # Refresh again in the background ahead of the expiry, so callers
+        # don't have to wait for it.
+        if self.__refresh_task is None or self.__refresh_task.done():
+            self.__refresh_task = asyncio.create_task(self.__refresh_in_background())
+
+    async def __refresh_in_background(self):
+        while True:
+            refresh_in = (
+                self.__mgmt_client_expires_at - datetime.datetime.utcnow()
+            ).total_seconds() * 0.9
+            await asyncio.sleep(max(refresh_in, 0))
+
+            try:
+                async with self.__mgmt_client_lock:
+                    await self.__refresh_client()
+            except Exception as err:  # pylint: disable=broad-except
+                # The client is then refreshed on demand when it expires.
+                logger.warning(f"Unable to refresh the Auth0 Management API client: {err}")
+                return
+
+    async def get_jobs(self) -> auth0.management.Jobs:
+        return await self.__get_service("jobs")
 
     async def get_organizations(self) -> auth0.management.Organizations:
-        mgmt_client = await self.get_client()
-        return Auth0BackoffWrapper(mgmt_client.organizations)
+        return await self.__get_service("organizations")
 
     async def get_roles(self) -> auth0.management.Roles:
-        mgmt_client = await self.get_client()
-        return Auth0BackoffWrapper(mgmt_client.roles)
+        return await self.__get_service("roles")
 
     async def get_users(self) -> auth0.management.Users:
+        return await self.__get_service("users")
+
+    async def __get_service(self, name):
         mgmt_client = await self.get_client()
-        return Auth0BackoffWrapper(mgmt_client.users)
+        if (service := self.__wrapped_services.get(name)) is None:
+            service = Auth0BackoffWrapper(getattr(mgmt_client, name), self.__rate_limiter)
+            self.__wrapped_services[name] = service
+        return service
 
 
 
 
 _PER_PAGE = 100
+_USER_ROLES_BY_NAME = {role.value: role for role in UserRole}
+_DELETE_MEMBERS_CHUNK_SIZE = 100
+# Members requested with the total by `count_users`
+_COUNT_PAGE_SIZE = 50
 
 
 class Auth0UserBuilder:
@@ -152,34 +275,24 @@ class Auth0UserBuilder:
         self.__mgmt_api_factory = auth0_management_api_factory
         self.__organization_manager = organization_manager
 
-        self.__default_user_role: UserRole | None = None
-        self.__organization: Organization | None = None
-        self.__role_map: dict[UserRole, str] | None = None
+    # The organization, its settings and the role map are cached by the
+    # manager's metadata cache, shared by every builder.
 
     @property
     async def default_user_role(self) -> UserRole:
-        if not self.__default_user_role:
-            # Defer default user role retrieval until it is needed.
-            org_settings = await self.__organization_manager.get_settings()
-            self.__default_user_role = org_settings["default_user_role"]
-
-        return self.__default_user_role
+        # Defer default user role retrieval until it is needed.
+        org_settings = await self.__organization_manager.get_settings()
+        return org_settings["default_user_role"]
 
     @property
     async def organization(self) -> Organization:
-        if not self.__organization:
-            self.__organization = await self.__organization_manager.get_organization()
-        return self.__organization
+        return await self.__organization_manager.get_organization()
 
     @property
     async def role_map(self) -> dict[UserRole, str]:
-        if self.__role_map is None:
-            self.__role_map = await _get_role_map(self.__mgmt_api_factory)
-        return self.__role_map
+        return await self.__organization_manager._get_role_map()
 
     async def build(self, auth0_member: dict[str, Any]) -> User:
-        user_id = auth0_member["user_id"]
-
         organization = await self.organization
 
         member_role: UserRole
@@ -194,23 +307,10 @@ class Auth0UserBuilder:
             )
         except ValueError:
             # The are no roles currently set for the member. Use the default role.
+            # It's only set in memory here, members without roles get it in
+            # Auth0 in bulk with `Auth0Manager.sync_user_roles`.
             member_role = await self.default_user_role
-            role_map = await self.role_map
-
-            # TODO: Update here to fill in the value of the default role if one wasn't in Auth0
-
-            # print(f"Adding role: '{member_role}' to Auth0 member: '{user_id}'")
-            # try:
-            #     # Explicitly add the role add to the organization member.
-            #     auth0_mgmt_organizations = await self.__mgmt_api_factory.get_organizations()
-            #     create_role_fn = auth0_mgmt_organizations.create_organization_member_roles_async
-            #     await create_role_fn(organization.id, user_id, {"roles": [role_map[member_role]]})
-            # except Exception as err:  # pylint: disable=broad-except
-            #     # Except and warn. This isn't a show stopper error as we have already added
-            #     # the default in memory.
-            #     print(
-            #         f"Error adding role: '{member_role}' to Auth0 member: '{user_id}'. " f"{err}"
-            #     )
+
         # Create user model
         return User(
             email=auth0_member["email"],
@@ -221,12 +321,109 @@ class Auth0UserBuilder:
             role=member_role,
         )
 
+    async def build_many(self, auth0_members: list[dict[str, Any]]) -> list[User]:
+        """Build users for a page of Auth0 members at once.
+
+        Same as `build` for each member, but the organization and default role
+        are only resolved once and users are created without re-validating
+        the organization for every user.
+        """
+        organization = await self.organization
+        default_user_role = None
+
+        users = []
+        for auth0_member in auth0_members:
+            # Use max of the set roles to determine the actual role.
+            member_role = None
+            for auth0_role in auth0_member["roles"]:
+                role = _USER_ROLES_BY_NAME.get(auth0_role["name"])
+                if role is not None and (member_role is None or role > member_role):
+                    member_role = role
+
+            if member_role is None:
+                # The are no roles currently set for the member. Use the default role.
+                if default_user_role is None:
+                    default_user_role = await self.default_user_role
+                member_role = default_user_role
+
+            email = auth0_member["email"]
+            user_id = auth0_member["user_id"]
+            name = auth0_member["name"]
+            picture = auth0_member.get("picture")
+
+            if not (
+                isinstance(email, str)
+                and isinstance(user_id, str)
+                and (name is None or isinstance(name, str))
+                and (picture is None or isinstance(picture, str))
+            ):
+                # Let validation report the unexpected member.
+                users.append(
+                    User(
+                        email=email,
+                        id=user_id,
+                        name=name,
+                        organization=organization,
+                        picture=picture,
+                        role=member_role,
+                    )
+                )
+                continue
+
+            # The fields have been checked above, skip validating the model.
+            users.append(
+                User.construct(
+                    email=email,
+                    id=user_id,
+                    name=name,
+                    organization=organization,
+                    picture=picture,
+                    role=member_role,
+                )
+            )
+
+        return users
+
+
+def _plausible_total(response, per_page):
+    """The member count of a first page of members requested with
+    ``include_totals``, or None if Auth0 left the total out or it can't be
+    trusted.
+
+    The organization members endpoint doesn't always report the full count,
+    e.g. it's missing from checkpoint responses and may be capped to the
+    page. A last page that isn't full holds every member, so it's counted
+    instead. The total of a full page is only trusted if it's larger than
+    the page.
+    """
+    if isinstance(response, list):
+        # Without the total
+        return len(response) if len(response) < per_page else None
+    if not isinstance(response, dict) or not isinstance(response.get("members"), list):
+        return None
+
+    page_length = len(response["members"])
+    if page_length < per_page and not response.get("next"):
+        return page_length
+
+    total = response.get("total")
+    if not isinstance(total, int) or total <= page_length:
+        return None
+
+    return total
+
 
 async def _get_role_map(
     auth0_management_api_factory,
+    /,
+    create: bool = True,
 ) -> dict[UserRole, str]:
     """Get a mapping between roles and their Auth0 ID.
 
+    Args:
+        create (bool): Whether to create the roles missing in Auth0, or
+            leave them out of the map.
+
     Returns:
         dict[constants.UserRole, str]: A map of the role and the Auth0 ID.
     """
@@ -242,6 +439,8 @@ async def _get_role_map(
         )
 
         if not auth0_role:
+            if not create:
+                continue
             auth0_role = await auth0_roles.create_async(
                 {"name": role.value, "description": role.value.lower()}
             )
@@ -257,13 +456,49 @@ class Auth0Manager:
         self,
         organization_id: str,
         auth0_management_api_factory,
+        /,
+        metadata_cache: Auth0MetadataCache = auth0_metadata_cache,
     ):
         self._organization_id = organization_id
         self.__mgmt_api_factory = auth0_management_api_factory
 
-        self.__role_map: dict[UserRole, str] | None = None
+        # The organization, its settings and the tenant's role map, shared
+        # with the other managers and possibly across runs. Keyed by the
+        # tenant so that a cache on disk can't mix up tenants.
+        self.__metadata_cache = metadata_cache
+        self.__role_map_key = f"{auth0_management_api_factory.domain}/roles"
+        self.__organization_key = (
+            f"{auth0_management_api_factory.domain}/organizations/{organization_id}"
+        )
+
+        # Index of the organization's member IDs, see `_get_member_ids`.
+        self.__member_ids: set[str] | None = None
+        self.__member_ids_expires_at = 0.0
+        self.__member_ids_lock = asyncio.Lock()
+
+        # Index of the organization's users, see `_get_user_index`.
+        self.__users_by_id: dict[str, User] | None = None
+        self.__users_by_email: dict[str, User] | None = None
+        self.__users_expires_at = 0.0
+        self.__users_lock = asyncio.Lock()
+
+        # Counts and their expiry time, see `count_users` and
+        # `count_invitations`.
+        self.__counts: dict[str, tuple[int, float]] = {}
+        # Resolved with the member count by a pass over every member that is
+        # in progress, if any.
+        self.__member_scan: asyncio.Future | None = None
 
     async def count_invitations(self) -> int:
+        """Count the pending invitations of the organization.
+
+        Costs one request if Auth0 reports the total, otherwise the
+        invitations are counted a page at a time. The count is cached for
+        ``Config.AUTH0_COUNTS_CACHE_TTL`` seconds.
+        """
+        if (count := self.__get_cached_count("invitations")) is not None:
+            return count
+
         page = 0
 
         count: int = 0
@@ -275,8 +510,15 @@ class Auth0Manager:
                 self._organization_id,
                 page=page,
                 per_page=_PER_PAGE,
+                include_totals=True,
             )
 
+            if isinstance(res, dict):
+                if "total" in res:
+                    count = res["total"]
+                    break
+                res = res["invitations"]
+
             if (length := len(res)) == 0:
                 break
 
@@ -284,27 +526,45 @@ class Auth0Manager:
 
             page += 1
 
+        self.__cache_count("invitations", count)
         return count
 
-    async def count_users(self) -> int:
-        auth0_mgmt_organizations = await self.__mgmt_api_factory.get_organizations()
+    async def count_users(self) -> int | None:
+        """Count the members of the organization.
 
-        count = 0
+        Costs one request if Auth0 reports a plausible total, see
+        `_plausible_total`. Otherwise the count is taken from the member ID
+        index if it's already built, or from a full pass over the members
+        that is already running, e.g. for the migration. A pass is never
+        started just to count. The count is cached for
+        ``Config.AUTH0_COUNTS_CACHE_TTL`` seconds.
 
-        from_param = None
-        while True:
-            auth0_member_res = await auth0_mgmt_organizations.all_organization_members_async(
-                self._organization_id,
-                fields=["user_id"],
-                take=100,  # 100 is the maximum value for this param.
-                from_param=from_param,
-            )
+        Returns:
+            int | None: The number of members, or ``None`` if it can't be
+                known without a pass over the members.
+        """
+        if (count := self.__get_cached_count("users")) is not None:
+            return count
 
-            count += len(auth0_member_res["members"])
+        auth0_mgmt_organizations = await self.__mgmt_api_factory.get_organizations()
+        auth0_member_res = await auth0_mgmt_organizations.all_organization_members_async(
+            self._organization_id,
+            fields=["user_id"],
+            page=0,
+            per_page=_COUNT_PAGE_SIZE,
+            include_totals=True,
+        )
 
-            if (from_param := auth0_member_res.get("next")) is None:
-                break
+        count = _plausible_total(auth0_member_res, _COUNT_PAGE_SIZE)
+        if count is None:
+            if self.__member_ids is not None and self.__member_ids_expires_at > time.monotonic():
+                count = len(self.__member_ids)
+            elif self.__member_scan is not None:
+                # None if the pass was stopped before the last page.
+                count = await asyncio.shield(self.__member_scan)
 
+        if count is not None:
+            self.__cache_count("users", count)
         return count
 
     async def create_group(self, /, name: str, description: str, accessor_id: str) -> Group:
@@ -318,22 +578,109 @@ class Auth0Manager:
 
 
     async def get_organization(self) -> Organization:
-        print("Retrieving Organization from Auth0...")
+        return (await self.__get_organization_metadata())["organization"]
+
+    async def __get_organization_metadata(self):
+        # The organization and its settings come from the same response, so
+        # they're cached together.
+        return await self.__metadata_cache.get(
+            self.__organization_key,
+            self.__fetch_organization_metadata,
+            decode=lambda value: {
+                "organization": Organization(**value["organization"]),
+                "settings": {
+                    **value["settings"],
+                    "default_user_role": UserRole(value["settings"]["default_user_role"]),
+                },
+            },
+        )
+
+    async def __fetch_organization_metadata(self):
+        logger.debug("Retrieving Organization from Auth0...")
         auth0_mgmt_orgs = await self.__mgmt_api_factory.get_organizations()
         response = await auth0_mgmt_orgs.get_organization_async(self._organization_id)
 
-        return Organization(
+        metadata = response.get("metadata") or {}
+        organization = Organization(
             id=response["id"],
             name=response["name"],
             display_name=response["display_name"],
             logo_url=response.get("branding", {}).get("logo_url"),
-            pypi_token=response.get("metadata", {}).get("pypi_token"),
+            pypi_token=metadata.get("pypi_token"),
         )
 
+        default_user_role = metadata.get("default_user_role") or Config.DEFAULT_USER_ROLE
+        if default_user_role not in _USER_ROLES_BY_NAME:
+            logger.warning(
+                f"Invalid default user role '{default_user_role}' of organization "
+                f"'{self._organization_id}', using '{Config.DEFAULT_USER_ROLE}'"
+            )
+            default_user_role = Config.DEFAULT_USER_ROLE
+
+        return {
+            "organization": organization,
+            "settings": {"default_user_role": UserRole(default_user_role)},
+        }
+
+    async def _get_connection_ids(self) -> list[str]:
+        """Get the IDs of the connections enabled for the organization."""
+        auth0_mgmt_orgs = await self.__mgmt_api_factory.get_organizations()
+
+        connection_ids = []
+        page = 0
+        while True:
+            res = await auth0_mgmt_orgs.all_organization_connections_async(
+                self._organization_id, page=page, per_page=_PER_PAGE
+            )
+            if isinstance(res, dict):
+                res = res["enabled_connections"]
+
+            connection_ids.extend(connection["connection_id"] for connection in res)
+            if len(res) < _PER_PAGE:
+                break
+
+            page += 1
+
+        return connection_ids
+
+    async def get_role_map(self) -> dict[UserRole, str]:
+        """Get a mapping between roles and their Auth0 ID, creating any
+        missing role in Auth0."""
+        return await self._get_role_map()
+
+    async def find_role_map(self) -> dict[UserRole, str]:
+        """Get a mapping between the roles that exist in Auth0 and their ID,
+        without creating missing roles, e.g. for a read-only export."""
+        return await _get_role_map(self.__mgmt_api_factory, create=False)
+
+    async def get_settings(self) -> dict[str, Any]:
+        """Get the settings of the organization.
+
+        The default user role is read from the ``default_user_role`` of the
+        organization's metadata in Auth0, if set, and defaults to
+        ``Config.DEFAULT_USER_ROLE``.
+
+        Returns:
+            dict[str, Any]: The settings, i.e. ``default_user_role``.
+        """
+        return (await self.__get_organization_metadata())["settings"]
+
     async def get_user(self, user_id: str) -> User | None:
-        async for user in self.iter_users(search=[(user_id, ("email", "user_id"))]):
-            return user
-        return None
+        """Get a user of the organization by user ID or email."""
+        return (await self.get_users([user_id]))[0]
+
+    async def get_users(self, user_ids: list[str]) -> list[User | None]:
+        """Get users of the organization by user ID or email.
+
+        Returns:
+            list[User | None]: The user for each ID, or ``None`` if there is
+                no such user in the organization.
+        """
+        users_by_id, users_by_email = await self._get_user_index()
+        return [
+            users_by_id.get(user_id) or users_by_email.get(user_id.casefold())
+            for user_id in user_ids
+        ]
 
     async def iter_groups(
         self,
@@ -347,81 +694,434 @@ class Auth0Manager:
     async def _build_user(
         self, user_builder: Auth0UserBuilder, auth0_member: dict[str, Any]
     ) -> User:
-        return await user_builder.build(auth0_member)
+        with metrics.timed("auth0.build_user"):
+            return await user_builder.build(auth0_member)
+
+    async def _build_users(
+        self, user_builder: Auth0UserBuilder, auth0_members: list[dict[str, Any]]
+    ) -> list[User]:
+        with metrics.timed("auth0.build_users"):
+            return await user_builder.build_many(auth0_members)
 
     async def __iter_users(
-        self, search: list[tuple[str, list[Literal["email", "id", "name"]]]] | None
+        self,
+        search: list[tuple[str, list[Literal["email", "id", "name"]]]] | None,
+        prefetch: int = 0,
     ) -> AsyncIterator[User]:
-        search = (
-            [
-                (
-                    re.compile(re.escape(term.lower()), re.IGNORECASE),
-                    ["id" if field == "user_id" else field for field in fields],
+        search_plan = UserSearchPlan(search)
+        user_builder = Auth0UserBuilder(self.__mgmt_api_factory, self)
+
+        # Let Auth0 find the candidates when it can, rather than going through
+        # every member.
+        if search_plan.query is not None:
+            async for user in self.__search_users(search_plan.query, user_builder):
+                if search_plan.matches(user):
+                    yield user
+            return
+
+        async for auth0_member_res in self.__iter_member_pages(
+            ["roles", "user_id", "email", "picture", "name"], prefetch=prefetch
+        ):
+            for user in await self._build_users(user_builder, auth0_member_res["members"]):
+                if search_plan.matches(user):
+                    yield user
+
+    async def __search_users(
+        self, query: str, user_builder: Auth0UserBuilder
+    ) -> AsyncIterator[User]:
+        """Search the tenant's users with an Auth0 user search query and
+        yield the ones that are members of the organization.
+
+        Membership is checked with the member ID index if it's already built,
+        otherwise for each match, so that a search never costs a pass over
+        every member.
+        """
+        auth0_mgmt_users = await self.__mgmt_api_factory.get_users()
+        auth0_mgmt_orgs = await self.__mgmt_api_factory.get_organizations()
+
+        member_ids = None
+        if self.__member_ids is not None and self.__member_ids_expires_at > time.monotonic():
+            member_ids = self.__member_ids
+
+        page = 0
+        while True:
+            auth0_user_res = await auth0_mgmt_users.list_async(
+                page=page,
+                per_page=_PER_PAGE,
+                q=query,
+                search_engine="v3",
+                fields=["user_id", "email", "picture", "name"],
+            )
+
+            for auth0_user in auth0_user_res["users"]:
+                if member_ids is not None:
+                    if auth0_user["user_id"] not in member_ids:
+                        continue
+                elif not await self.__is_member(auth0_mgmt_users, auth0_user["user_id"]):
+                    continue
+
+                roles = await auth0_mgmt_orgs.all_organization_member_roles_async(
+                    self._organization_id, auth0_user["user_id"]
                 )
-                for term, fields in search
-            ]
-            if search
-            else []
-        )
+                yield await self._build_user(user_builder, {**auth0_user, "roles": roles})
 
-        user_builder = Auth0UserBuilder(self.__mgmt_api_factory, self)
-        auth0_mgmt_organizations = await self.__mgmt_api_factory.get_organizations()
+            page += 1
+            if page * _PER_PAGE >= auth0_user_res.get("total", 0):
+                break
 
-        from_param = None
+    async def __is_member(self, auth0_mgmt_users, user_id):
+        # A user is in a handful of organizations at most, so this is usually
+        # a single request.
+        page = 0
         while True:
-            auth0_member_res = await auth0_mgmt_organizations.all_organization_members_async(
-                self._organization_id,
-                fields=["roles", "user_id", "email", "picture", "name"],
-                take=_PER_PAGE,
-                from_param=from_param,
+            res = await auth0_mgmt_users.list_organizations_async(
+                user_id, page=page, per_page=_PER_PAGE, include_totals=True
             )
+            organizations = res["organizations"] if isinstance(res, dict) else res
+            if any(org["id"] == self._organization_id for org in organizations):
+                return True
+            if len(organizations) < _PER_PAGE:
+                return False
 
-            for auth0_member in auth0_member_res["members"]:
-                user = await self._build_user(user_builder, auth0_member)
+            page += 1
+
+    async def __iter_member_pages(
+        self, fields: list[str], /, from_param: str | None = None, prefetch: int = 0
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Iterate over the raw pages of organization members.
+
+        A pass from the first page counts the members on the way, for
+        `count_users`.
+
+        Args:
+            fields (list[str]): The member fields to retrieve.
+            from_param (str | None): The checkpoint to start from. If ``None``,
+                start from the first page.
+            prefetch (int): The number of pages to read ahead in the
+                background while the current page is being processed. If
+                ``0``, the next page is only requested once the current page
+                has been consumed.
+
+        Yields:
+            dict[str, Any]: The Auth0 members response for each page.
+        """
+        scan = None
+        if from_param is None and self.__member_scan is None:
+            scan = self.__member_scan = asyncio.get_running_loop().create_future()
 
-                for pattern, fields in search:
-                    if not any(re.search(pattern, getattr(user, field)) for field in fields):
+        count = 0
+        complete = False
+        try:
+            async for auth0_member_res in self.__read_member_pages(fields, from_param, prefetch):
+                count += len(auth0_member_res["members"])
+                yield auth0_member_res
+            complete = True
+        finally:
+            if complete and from_param is None:
+                self.__cache_count("users", count)
+
+            if scan is not None:
+                scan.set_result(count if complete else None)
+                self.__member_scan = None
+
+    async def __read_member_pages(self, fields, from_param, prefetch):
+        auth0_mgmt_organizations = await self.__mgmt_api_factory.get_organizations()
+
+        async def get_page(from_param):
+            with metrics.timed("auth0.members_page"):
+                return await auth0_mgmt_organizations.all_organization_members_async(
+                    self._organization_id,
+                    fields=fields,
+                    take=_PER_PAGE,
+                    from_param=from_param,
+                )
+
+        # Don't hold more than the configured number of members in memory.
+        prefetch = min(prefetch, Config.AUTH0_PREFETCH_MAX_MEMBERS // _PER_PAGE)
+
+        if prefetch <= 0:
+            while True:
+                auth0_member_res = await get_page(from_param)
+                yield auth0_member_res
+
+                if (from_param := auth0_member_res.get("next")) is None:
+                    break
+            return
+
+        # Checkpoint pagination means the next page can only be requested once
+        # the previous one is returned, so the pages are read ahead in order by
+        # a single background task and handed off through a bounded queue.
+        pages = asyncio.Queue(maxsize=prefetch)
+
+        async def read_ahead(from_param):
+            try:
+                while True:
+                    auth0_member_res = await get_page(from_param)
+                    await pages.put(auth0_member_res)
+
+                    if (from_param := auth0_member_res.get("next")) is None:
                         break
-                else:
-                    yield user
 
-            if (from_param := auth0_member_res.get("next")) is None:
-                break
+                await pages.put(None)
+            except Exception as err:  # pylint: disable=broad-except
+                # Re-raised in the consumer.
+                await pages.put(err)
+
+        read_ahead_task = asyncio.create_task(read_ahead(from_param))
+        try:
+            while (auth0_member_res := await pages.get()) is not None:
+                if isinstance(auth0_member_res, Exception):
+                    raise auth0_member_res
+
+                yield auth0_member_res
+        finally:
+            read_ahead_task.cancel()
 
     async def iter_users(
         self,
         /,
         search: list[tuple[str, list[Literal["email", "id", "name"]]]] | None = None,
         order: tuple[Literal["email", "name"], Literal[1, -1]] | None = None,
+        prefetch: int | None = None,
+        limit: int | None = None,
     ) -> AsyncIterator[User]:
-        print("Retrieving User Information from Auth0...")
-        user_iter = self.__iter_users(search)
+        logger.debug("Retrieving User Information from Auth0...")
+        if prefetch is None:
+            prefetch = Config.AUTH0_PREFETCH_PAGES
+
+        user_iter = self.__iter_users(search, prefetch=prefetch)
 
-        # Only sort if `order`` is explicitly provided. Getting all the user into memory to sort
-        # can be an expensive operation.
+        # Only sort if `order`` is explicitly provided. Sorting all the users can be an expensive
+        # operation, so it's done in bounded memory.
         if order is None:
+            count = 0
             async for user in user_iter:
+                if limit is not None and count >= limit:
+                    break
+                yield user
+                count += 1
+        elif limit is not None:
+            key, reverse = order[0], order[1] != 1
+            for user in await top_users(user_iter, key, limit, reverse=reverse):
                 yield user
         else:
-            users = [user async for user in user_iter]
-
             key, reverse = order[0], order[1] != 1
-            for user in sorted(
-                users, key=lambda user: getattr(user, key).lower(), reverse=reverse
+            async for user in sort_users(
+                user_iter, key, reverse=reverse, run_size=Config.SORT_RUN_SIZE
             ):
                 yield user
 
+    async def iter_user_pages(
+        self,
+        /,
+        from_param: str | None = None,
+        prefetch: int | None = None,
+        shard: tuple[int, int] | None = None,
+    ) -> AsyncIterator[tuple[str | None, list[User]]]:
+        """Iterate over the users of the organization a page at a time.
+
+        Args:
+            from_param (str | None): The checkpoint to start from, as yielded
+                for a previous page. If ``None``, start from the first page.
+            prefetch (int | None): The number of pages to read ahead. Defaults
+                to ``Config.AUTH0_PREFETCH_PAGES``.
+            shard (tuple[int, int] | None): ``(index, count)`` to only get
+                the users of one of ``count`` shards, see `shard_of`.
+
+        Yields:
+            tuple[str | None, list[User]]: The checkpoint of the next page, or
+                ``None`` for the last page, and the users of the page.
+        """
+        logger.debug("Retrieving User Information from Auth0...")
+        if prefetch is None:
+            prefetch = Config.AUTH0_PREFETCH_PAGES
+
+        user_builder = Auth0UserBuilder(self.__mgmt_api_factory, self)
+
+        async for auth0_member_res in self.__iter_member_pages(
+            ["roles", "user_id", "email", "picture", "name"],
+            from_param=from_param,
+            prefetch=prefetch,
+        ):
+            auth0_members = auth0_member_res["members"]
+            if shard is not None:
+                # Skip the other shards' members before paying for building them.
+                index, count = shard
+                auth0_members = [
+                    auth0_member
+                    for auth0_member in auth0_members
+                    if shard_of(auth0_member["user_id"], count) == index
+                ]
+
+            users = await self._build_users(user_builder, auth0_members)
+            yield auth0_member_res.get("next"), users
+
+    async def iter_exported_user_pages(
+        self,
+        /,
+        from_param: str | None = None,
+        shard: tuple[int, int] | None = None,
+        connection_ids: list[str] | None = None,
+    ) -> AsyncIterator[tuple[str | None, list[User]]]:
+        """Iterate over the users of the organization a page at a time, read
+        from Auth0 bulk user export jobs instead of member pages.
+
+        One export job is run for each connection of the organization, at
+        most ``Config.AUTH0_EXPORT_CONCURRENCY`` at a time since Auth0 limits
+        the concurrent export jobs of a tenant. While Auth0 runs the jobs, the
+        roles of the members are read in a single pass over the members. The
+        exports are then downloaded and parsed as a stream, and the exported
+        users that are members are joined with their roles, so the members'
+        details never go through the rate limited Management API.
+
+        Args:
+            from_param (str | None): The checkpoint to start from, as yielded
+                for a previous page. An export can't be resumed part way, so
+                this is the connection to start from. If ``None``, start from
+                the first connection.
+            shard (tuple[int, int] | None): ``(index, count)`` to only get
+                the users of one of ``count`` shards, see `shard_of`.
+            connection_ids (list[str] | None): The connections to export.
+                Defaults to the connections enabled for the organization.
+
+        Yields:
+            tuple[str | None, list[User]]: The checkpoint of the next page, or
+                ``None`` for the last page, and the users of the page.
+
+        Raises:
+            Auth0ExportError: If an export job failed or timed out.
+        """
+        logger.debug("Retrieving User Information from Auth0 exports...")
+        if connection_ids is None:
+            connection_ids = await self._get_connection_ids()
+        if from_param in connection_ids:
+            connection_ids = connection_ids[connection_ids.index(from_param) :]
+
+        async def get_member_roles():
+            member_roles = {}
+            async for auth0_member_res in self.__iter_member_pages(
+                ["user_id", "roles"], prefetch=Config.AUTH0_PREFETCH_PAGES
+            ):
+                for auth0_member in auth0_member_res["members"]:
+                    user_id = auth0_member["user_id"]
+                    if shard is None or shard_of(user_id, shard[1]) == shard[0]:
+                        member_roles[user_id] = auth0_member["roles"]
+            return member_roles
+
+        auth0_mgmt_jobs = await self.__mgmt_api_factory.get_jobs()
+        export_slots = asyncio.Semaphore(Config.AUTH0_EXPORT_CONCURRENCY)
+
+        async def run_export(connection_id):
+            # The slots are taken in order, so the exports complete about in
+            # the order they're downloaded.
+            async with export_slots:
+                job_id = await start_users_export(auth0_mgmt_jobs, connection_id)
+                return await wait_for_users_export(
+                    auth0_mgmt_jobs,
+                    job_id,
+                    poll_interval=Config.AUTH0_EXPORT_POLL_INTERVAL,
+                    timeout=Config.AUTH0_EXPORT_TIMEOUT,
+                )
+
+        member_roles_task = asyncio.create_task(get_member_roles())
+        # The exports run in Auth0 while the members are read and the
+        # previous exports are downloaded.
+        export_tasks = [
+            asyncio.create_task(run_export(connection_id)) for connection_id in connection_ids
+        ]
+        try:
+            member_roles = await member_roles_task
+
+            user_builder = Auth0UserBuilder(self.__mgmt_api_factory, self)
+            for i, (connection_id, export_task) in enumerate(zip(connection_ids, export_tasks)):
+                location = await export_task
+
+                auth0_members = []
+                async for auth0_user in iter_users_export(location):
+                    # Taken out so that a user in several exports is only
+                    # built once, and to find the members in none.
+                    if (roles := member_roles.pop(auth0_user["user_id"], None)) is None:
+                        continue
+
+                    auth0_members.append({**auth0_user, "roles": roles})
+                    if len(auth0_members) == _PER_PAGE:
+                        yield connection_id, await self._build_users(user_builder, auth0_members)
+                        auth0_members = []
+
+                next_param = connection_ids[i + 1] if i + 1 < len(connection_ids) else None
+                yield next_param, await self._build_users(user_builder, auth0_members)
+        finally:
+            member_roles_task.cancel()
+            for export_task in export_tasks:
+                export_task.cancel()
+
+        if member_roles and from_param is None:
+            logger.warning(
+                f"{len(member_roles)} member(s) of '{self._organization_id}' were not in the "
+                "export of any of its connections"
+            )
+
+    def preload(
+        self,
+        organization: Organization,
+        role_map: dict[UserRole, str],
+        settings: dict[str, Any],
+    ) -> None:
+        """Use an organization, role map and settings that were already
+        retrieved, e.g. by the coordinator of a sharded migration, instead of
+        getting them from Auth0.
+
+        They're only used by this process, not written to the file of the
+        metadata cache, which the process that retrieved them already did.
+        """
+        self.__metadata_cache.set(
+            self.__organization_key,
+            {"organization": organization, "settings": settings},
+            persist=False,
+        )
+        self.__metadata_cache.set(self.__role_map_key, role_map, persist=False)
+
+    def invalidate_metadata(self) -> None:
+        """Drop the cached organization, settings and role map, they're
+        fetched from Auth0 again when next needed."""
+        self.__metadata_cache.invalidate(self.__organization_key, self.__role_map_key)
+
+    def invalidate_members(self) -> None:
+        """Drop the cached member and user indexes and member count, they're
+        rebuilt when next needed."""
+        self.__member_ids = None
+        self.__users_by_id = self.__users_by_email = None
+        self.__counts.pop("users", None)
+
     async def remove_user(self, user_id: str) -> None:
-        if not await self._is_auth0_organization_member(user_id):
+        await self.remove_users([user_id])
+
+    async def remove_users(self, user_ids: list[str]) -> None:
+        member_ids = await self._get_member_ids()
+        user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id in member_ids]
+        if not user_ids:
             return
 
         auth_mgmt_organizations = await self.__mgmt_api_factory.get_organizations()
 
-        # Remove member from organization.
-        await auth_mgmt_organizations.delete_organization_members_async(
-            self._organization_id, {"members": [user_id]}
+        # Remove members from organization.
+        await asyncio.gather(
+            *(
+                auth_mgmt_organizations.delete_organization_members_async(
+                    self._organization_id,
+                    {"members": user_ids[i : i + _DELETE_MEMBERS_CHUNK_SIZE]},
+                )
+                for i in range(0, len(user_ids), _DELETE_MEMBERS_CHUNK_SIZE)
+            )
         )
 
+        member_ids.difference_update(user_ids)
+        self.__counts.pop("users", None)
+        if self.__users_by_id is not None:
+            for user_id in user_ids:
+                if (user := self.__users_by_id.pop(user_id, None)) is not None:
+                    self.__users_by_email.pop(user.email.casefold(), None)
+
     async def revoke_invitation(self, invitation_id: str) -> None:
         auth0_mgmt_orgs = await self.__mgmt_api_factory.get_organizations()
         await auth0_mgmt_orgs.delete_organization_invitation_async(
@@ -456,6 +1156,102 @@ class Auth0Manager:
 
         await asyncio.gather(*tasks)
 
+    async def sync_user_roles(
+        self,
+        /,
+        roles: dict[str, UserRole] | None = None,
+        default_role: UserRole | None = None,
+    ) -> dict[str, int]:
+        """Set the roles of organization members in Auth0 in bulk.
+
+        The current roles of every member are read in one pass over the
+        members, members whose roles already match are skipped, and the
+        others are updated grouped by role, with at most
+        ``Config.AUTH0_ROLE_SYNC_CONCURRENCY`` members at a time, under the
+        Auth0 rate limit.
+
+        Args:
+            roles (dict[str, UserRole] | None): The role to set for each user
+                ID, removing any other role of the member. If ``None``, give
+                the default role to every member without a role instead.
+            default_role (UserRole | None): The role to give to members
+                without one. Defaults to the organization's default user role.
+
+        Returns:
+            dict[str, int]: The number of members that were ``updated``,
+                ``unchanged`` or ``failed``.
+        """
+        role_map = await self._get_role_map()
+
+        counts = {"updated": 0, "unchanged": 0, "failed": 0}
+
+        # Members to update by role, with whether the role needs to be added
+        # and the role IDs to remove.
+        updates: dict[UserRole, list[tuple[str, bool, list[str]]]] = {}
+        async for auth0_member_res in self.__iter_member_pages(["user_id", "roles"]):
+            for auth0_member in auth0_member_res["members"]:
+                user_id = auth0_member["user_id"]
+                if roles is not None:
+                    if (role := roles.get(user_id)) is None:
+                        continue
+                elif any(r["name"] in _USER_ROLES_BY_NAME for r in auth0_member["roles"]):
+                    counts["unchanged"] += 1
+                    continue
+                else:
+                    if default_role is None:
+                        user_builder = Auth0UserBuilder(self.__mgmt_api_factory, self)
+                        default_role = await user_builder.default_user_role
+                    role = default_role
+
+                role_id = role_map[role]
+                current_role_ids = {r["id"] for r in auth0_member["roles"]}
+                if current_role_ids == {role_id}:
+                    counts["unchanged"] += 1
+                    continue
+
+                # Only replace other roles when the role is set explicitly.
+                remove_role_ids = sorted(current_role_ids - {role_id}) if roles is not None else []
+                updates.setdefault(role, []).append(
+                    (user_id, role_id not in current_role_ids, remove_role_ids)
+                )
+
+        auth0_mgmt_orgs = await self.__mgmt_api_factory.get_organizations()
+        semaphore = asyncio.Semaphore(Config.AUTH0_ROLE_SYNC_CONCURRENCY)
+
+        async def update_member(user_id, role_id, add, remove_role_ids):
+            async with semaphore:
+                try:
+                    if add:
+                        await auth0_mgmt_orgs.create_organization_member_roles_async(
+                            self._organization_id, user_id, {"roles": [role_id]}
+                        )
+                    if remove_role_ids:
+                        await auth0_mgmt_orgs.delete_organization_member_roles_async(
+                            self._organization_id, user_id, {"roles": remove_role_ids}
+                        )
+                except Exception as err:  # pylint: disable=broad-except
+                    # Keep going, the member keeps its roles until the next sync.
+                    logger.warning("Error setting role of Auth0 member: '%s'. %s", user_id, err)
+                    counts["failed"] += 1
+                else:
+                    counts["updated"] += 1
+
+        for role, members in updates.items():
+            logger.info(f"Setting role '{role.value}' for {len(members)} Auth0 member(s)...")
+            with metrics.timed("auth0.sync_roles"):
+                await asyncio.gather(
+                    *(
+                        update_member(user_id, role_map[role], add, remove_role_ids)
+                        for user_id, add, remove_role_ids in members
+                    )
+                )
+
+        if updates:
+            # Cached users may have the old roles.
+            self.invalidate_members()
+
+        return counts
+
     async def update_group(
         self,
         /,
@@ -473,36 +1269,78 @@ class Auth0Manager:
         Returns:
             dict[constants.UserRole, str]: A map of the role and the Auth0 ID.
         """
-        if self.__role_map is None:
-            self.__role_map = await _get_role_map(self.__mgmt_api_factory)
+        return await self.__metadata_cache.get(
+            self.__role_map_key,
+            lambda: _get_role_map(self.__mgmt_api_factory),
+            decode=lambda value: {UserRole(role): role_id for role, role_id in value.items()},
+        )
 
-        return self.__role_map
+    def __get_cached_count(self, name):
+        if (cached := self.__counts.get(name)) is not None and cached[1] > time.monotonic():
+            return cached[0]
+        return None
 
-    async def _is_auth0_organization_member(self, user_id: str) -> bool:
-        """Determine whether a user is a member of this organization.
+    def __cache_count(self, name, count):
+        self.__counts[name] = (count, time.monotonic() + Config.AUTH0_COUNTS_CACHE_TTL)
 
-        Args:
-            user_id (str): The user ID.
+    async def _get_member_ids(self) -> set[str]:
+        """Get the IDs of the organization members.
+
+        The IDs are retrieved in a single pass over the members and cached for
+        ``Config.AUTH0_MEMBERS_CACHE_TTL`` seconds or until
+        `invalidate_members` is called.
 
         Returns:
-            bool: Whether the user is a member or not.
+            set[str]: The member IDs.
         """
+        async with self.__member_ids_lock:
+            if self.__member_ids is None or self.__member_ids_expires_at <= time.monotonic():
+                member_ids = set()
+                async for response in self.__iter_member_pages(
+                    ["user_id"], prefetch=Config.AUTH0_PREFETCH_PAGES
+                ):
+                    member_ids.update(member["user_id"] for member in response["members"])
 
-        auth_mgmt_orgs = await self.__mgmt_api_factory.get_organizations()
+                self.__member_ids = member_ids
+                self.__member_ids_expires_at = time.monotonic() + Config.AUTH0_MEMBERS_CACHE_TTL
 
-        from_ = None
-        while True:
-            response = await auth_mgmt_orgs.all_organization_members_async(
-                self._organization_id, take=_PER_PAGE, from_param=from_
-            )
+            return self.__member_ids
 
-            for member in response["members"]:
-                if member["user_id"] == user_id:
-                    return True
+    async def _get_user_index(self) -> tuple[dict[str, User], dict[str, User]]:
+        """Get the organization users indexed by user ID and by casefolded
+        email.
 
-            if "next" not in response:
-                break
+        The index is built in a single pass over the members and cached like
+        the member IDs. It also refreshes the member IDs.
+
+        Returns:
+            tuple[dict[str, User], dict[str, User]]: The users by ID and by
+                email.
+        """
+        async with self.__users_lock:
+            if self.__users_by_id is None or self.__users_expires_at <= time.monotonic():
+                users_by_id = {}
+                users_by_email = {}
+                async for user in self.__iter_users(None, prefetch=Config.AUTH0_PREFETCH_PAGES):
+                    users_by_id[user.id] = user
+                    users_by_email[user.email.casefold()] = user
 
-            from_ = response["next"]
+                self.__users_by_id = users_by_id
+                self.__users_by_email = users_by_email
+                self.__users_expires_at = time.monotonic() + Config.AUTH0_MEMBERS_CACHE_TTL
 
-        return False
+                self.__member_ids = set(users_by_id)
+                self.__member_ids_expires_at = self.__users_expires_at
+
+            return self.__users_by_id, self.__users_by_email
+
+    async def _is_auth0_organization_member(self, user_id: str) -> bool:
+        """Determine whether a user is a member of this organization.
+
+        Args:
+            user_id (str): The user ID.
+
+        Returns:
+            bool: Whether the user is a member or not.
+        """
+        return user_id in await self._get_member_ids()
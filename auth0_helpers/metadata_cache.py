@@ -0,0 +1,174 @@
+"""
+| Copyright 2017-2024 Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+import pydantic
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(value):
+    if isinstance(value, pydantic.BaseModel):
+        return value.dict()
+    raise TypeError(f"Object of type {type(value).__name__} can't be cached to disk")
+
+
+class Auth0MetadataCache:
+    """Cache of Auth0 metadata that rarely changes, e.g. organizations,
+    their settings and the role map, shared by every `Auth0Manager` of the
+    process.
+
+    Entries expire after ``ttl`` seconds or when invalidated. Concurrent
+    misses of an entry are fetched once. If ``path`` is set, the entries are
+    also written to that JSON file and loaded from it by the next run, so
+    repeated runs skip fetching them from Auth0 again. The file holds the
+    organizations' PyPI tokens, so it's only readable by its owner.
+
+    Args:
+        ttl (float): Seconds before an entry is fetched again.
+        path (str | None): The file to persist the entries to, if any.
+    """
+
+    def __init__(self, /, ttl: float = 3600.0, path: str | None = None):
+        self.__ttl = ttl
+        self.__path = path
+
+        # key: [value, expires_at, decoded], with the wall clock expiry so
+        # that it holds across runs.
+        self.__entries: dict[str, list] | None = None
+        # Entries of this process only, see `set`.
+        self.__local_entries: dict[str, Any] = {}
+        self.__locks: dict[str, asyncio.Lock] = {}
+
+    @property
+    def path(self) -> str | None:
+        return self.__path
+
+    async def get(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        /,
+        decode: Callable[[Any], Any] | None = None,
+    ) -> Any:
+        """Get an entry, fetching it if it's missing or expired.
+
+        Args:
+            key (str): The key of the entry.
+            fetch: Called to get the value of a missing entry.
+            decode: Called to turn a value loaded from disk, as JSON, back
+                into the value that ``fetch`` returns.
+
+        Returns:
+            Any: The value. It's shared, so it must not be modified.
+        """
+        if (value := self.__local_entries.get(key)) is not None:
+            return value
+        if (value := self.__get(key, decode)) is not None:
+            return value
+
+        async with self.__locks.setdefault(key, asyncio.Lock()):
+            # Fetched by another caller while waiting for the lock.
+            if (value := self.__get(key, decode)) is not None:
+                return value
+
+            value = await fetch()
+            self.set(key, value)
+            return value
+
+    def set(self, key: str, value: Any, /, persist: bool = True) -> None:
+        """Add or replace an entry.
+
+        Args:
+            key (str): The key of the entry.
+            value: The value.
+            persist (bool): Whether to also write the entry to the file of the
+                cache. If not, the entry is only used by this process and
+                doesn't expire, e.g. for values handed over by another
+                process, which already wrote them.
+        """
+        if not persist:
+            self.__local_entries[key] = value
+            return
+
+        self.__load()
+        self.__entries[key] = [value, time.time() + self.__ttl, True]
+        self.__save()
+
+    def invalidate(self, *keys: str) -> None:
+        """Drop entries, every entry if no key is given, so that they are
+        fetched again."""
+        self.__load()
+        for key in keys or list(self.__entries):
+            self.__entries.pop(key, None)
+        for key in keys or list(self.__local_entries):
+            self.__local_entries.pop(key, None)
+        self.__save()
+
+    def __get(self, key, decode):
+        self.__load()
+        if (entry := self.__entries.get(key)) is None or entry[1] <= time.time():
+            return None
+
+        if not entry[2]:
+            entry[0] = decode(entry[0]) if decode is not None else entry[0]
+            entry[2] = True
+
+        return entry[0]
+
+    def __load(self):
+        if self.__entries is not None:
+            return
+
+        self.__entries = {}
+        if self.__path is None or not os.path.exists(self.__path):
+            return
+
+        try:
+            with open(self.__path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as err:
+            logger.warning(f"Ignoring the Auth0 metadata cache '{self.__path}': {err}")
+            return
+
+        now = time.time()
+        self.__entries = {
+            key: [entry["value"], entry["expires_at"], False]
+            for key, entry in entries.items()
+            if entry["expires_at"] > now
+        }
+
+    def __save(self):
+        if self.__path is None:
+            return
+
+        entries = {
+            key: {"value": value, "expires_at": expires_at}
+            for key, (value, expires_at, _) in self.__entries.items()
+        }
+        # Written to a file of this process and moved into place, so that
+        # concurrent runs, e.g. shards, never see a partial cache. Only the
+        # owner can read it, as it holds the organizations' PyPI tokens.
+        tmp_path = f"{self.__path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f, default=_encode)
+            os.replace(tmp_path, self.__path)
+        except (OSError, TypeError) as err:
+            logger.warning(f"Unable to write the Auth0 metadata cache '{self.__path}': {err}")
+
+
+# Shared by all Auth0 managers of the process.
+auth0_metadata_cache = Auth0MetadataCache(
+    ttl=Config.AUTH0_METADATA_CACHE_TTL, path=Config.AUTH0_METADATA_CACHE_PATH
+)
@@ -0,0 +1,119 @@
+"""
+| Copyright 2017-2024 Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import asyncio
+import time
+from typing import Mapping
+
+import aiohttp
+from config import Config
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> float | None:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class Auth0RateLimiter:
+    """Token bucket rate limiter for the Auth0 Management API.
+
+    Starts at the configured rate and then follows the rate limit reported by
+    Auth0 in the ``X-RateLimit-*`` and ``Retry-After`` response headers, so
+    that requests stay just under the tenant limit instead of running into
+    429s.
+    """
+
+    # Fraction of the reported rate limit to use.
+    SAFETY_FACTOR = 0.9
+    MIN_RATE = 0.5
+
+    def __init__(self, rate: float, /, burst: float | None = None):
+        self.__rate = rate
+        self.__capacity = burst if burst is not None else max(1.0, rate)
+        self.__tokens = self.__capacity
+        self.__updated_at = time.monotonic()
+        self.__blocked_until = 0.0
+
+        self.__lock = asyncio.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Current rate in requests per second."""
+        return self.__rate
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        # Waiters queue up on the lock, so requests are let through in order.
+        async with self.__lock:
+            while True:
+                now = time.monotonic()
+                if now < self.__blocked_until:
+                    await asyncio.sleep(self.__blocked_until - now)
+                    continue
+
+                self.__refill(now)
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.__tokens) / self.__rate)
+
+    def block(self, seconds: float) -> None:
+        """Hold all requests for the given number of seconds."""
+        self.__blocked_until = max(self.__blocked_until, time.monotonic() + seconds)
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Adjust to the rate limit reported in Auth0 response headers."""
+        if (retry_after := _header_number(headers, "Retry-After")) is not None:
+            self.block(retry_after)
+
+        limit = _header_number(headers, "X-RateLimit-Limit")
+        remaining = _header_number(headers, "X-RateLimit-Remaining")
+        reset_at = _header_number(headers, "X-RateLimit-Reset")
+        if limit is None or remaining is None:
+            return
+
+        now = time.monotonic()
+        self.__refill(now)
+
+        # Never assume more budget than Auth0 says is left.
+        self.__capacity = max(1.0, limit * self.SAFETY_FACTOR)
+        self.__tokens = min(self.__tokens, remaining * self.SAFETY_FACTOR)
+
+        if reset_at is None:
+            return
+
+        until_reset = reset_at - time.time()
+        if remaining < 1 and until_reset > 0:
+            self.block(until_reset)
+
+        # The reset time is when the Auth0 bucket is full again, which gives
+        # its refill rate. Smooth it as the reset time only has a resolution
+        # of seconds.
+        if until_reset >= 1 and remaining < limit:
+            observed_rate = (limit - remaining) / until_reset * self.SAFETY_FACTOR
+            self.__rate = max(self.MIN_RATE, 0.8 * self.__rate + 0.2 * observed_rate)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """An aiohttp trace config that updates the limiter from every response."""
+
+        async def on_request_end(_session, _context, params):
+            self.update(params.response.headers)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+    def __refill(self, now):
+        self.__tokens = min(
+            self.__capacity, self.__tokens + (now - self.__updated_at) * self.__rate
+        )
+        self.__updated_at = now
+
+
+# Shared by all Auth0 Management API clients of the process.
+auth0_rate_limiter = Auth0RateLimiter(Config.AUTH0_RATE_LIMIT)
@@ -0,0 +1,116 @@
+"""
+| Copyright 2017-2024 Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+from typing import Any, AsyncIterator
+
+import aiohttp
+import backoff
+from migration_helpers.gzip_ndjson import READ_SIZE, GzipNdjsonDecoder
+from migration_helpers.metrics import metrics
+
+# Fields of the exported users, as needed to build a `User`
+EXPORT_FIELDS = ("user_id", "email", "name", "picture")
+
+_PENDING_STATUSES = frozenset({"pending", "processing"})
+
+
+class Auth0ExportError(Exception):
+    """An Auth0 users export job failed or did not finish in time"""
+
+
+async def start_users_export(jobs, connection_id: str, /, fields=EXPORT_FIELDS) -> str:
+    """Create an Auth0 job exporting the users of a connection as gzipped
+    NDJSON.
+
+    Args:
+        jobs: The Auth0 Management API jobs service.
+        connection_id (str): The ID of the connection whose users to export.
+        fields: The user fields to export.
+
+    Returns:
+        str: The ID of the job.
+    """
+    job = await jobs.export_users_async(
+        {
+            "connection_id": connection_id,
+            "format": "json",
+            "fields": [{"name": field} for field in fields],
+        }
+    )
+    return job["id"]
+
+
+async def wait_for_users_export(
+    jobs, job_id: str, /, poll_interval: float = 1.0, timeout: float = 3600.0
+) -> str:
+    """Wait for an Auth0 users export job to complete.
+
+    The job status is polled with exponential backoff, starting after
+    ``poll_interval`` seconds and up to a minute between polls.
+
+    Args:
+        jobs: The Auth0 Management API jobs service.
+        job_id (str): The ID of the job.
+        poll_interval (float): Seconds before the first poll.
+        timeout (float): Seconds to wait for the job in total.
+
+    Returns:
+        str: The URL to download the export from.
+
+    Raises:
+        Auth0ExportError: If the job failed or did not complete in time.
+    """
+
+    @backoff.on_predicate(
+        backoff.expo,
+        lambda job: job["status"] in _PENDING_STATUSES,
+        max_time=timeout,
+        jitter=None,
+        logger=None,
+        factor=poll_interval,
+        max_value=60,
+    )
+    async def get_job():
+        return await jobs.get_async(job_id)
+
+    with metrics.timed("auth0.export_job"):
+        job = await get_job()
+
+    if job["status"] in _PENDING_STATUSES:
+        raise Auth0ExportError(f"Users export job '{job_id}' did not complete in {timeout}s")
+    if job["status"] != "completed" or not job.get("location"):
+        raise Auth0ExportError(f"Users export job '{job_id}' ended with status '{job['status']}'")
+
+    return job["location"]
+
+
+async def iter_users_export(location: str) -> AsyncIterator[dict[str, Any]]:
+    """Download a users export and yield its records as they arrive.
+
+    The export is decompressed and parsed a chunk at a time, so only the
+    current chunk and a partial line are held in memory, whatever the size
+    of the export.
+
+    Args:
+        location (str): The URL of the export, as returned by
+            `wait_for_users_export`. It is pre-signed, so no token is sent.
+
+    Yields:
+        dict[str, Any]: The exported user records.
+    """
+    # The export is gzipped as a file, not as a transfer encoding, so it is
+    # decompressed here whatever the response headers say.
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=300)
+    async with aiohttp.ClientSession(auto_decompress=False, timeout=timeout) as session:
+        async with session.get(location) as resp:
+            resp.raise_for_status()
+
+            decoder = GzipNdjsonDecoder()
+            async for chunk in resp.content.iter_chunked(READ_SIZE):
+                for record in decoder.decode(chunk):
+                    yield record
+
+            for record in decoder.flush():
+                yield record
@@ -0,0 +1,67 @@
+"""
+| Copyright 2017-2024 Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import re
+from typing import Literal
+
+from fiftyone_helpers import User
+
+SearchField = Literal["email", "id", "name", "user_id"]
+
+# Auth0 user search fields of the `User` fields
+_AUTH0_FIELDS = {"email": "email", "id": "user_id"}
+
+# Terms that are a complete value of the field, which Auth0 can match exactly.
+_COMPLETE_VALUE_PATTERNS = {
+    "email": re.compile(r"^[^@\s\"\\]+@[^@\s\"\\]+\.[^@\s\"\\]+$"),
+    "id": re.compile(r"^[\w.-]+\|[^\s\"\\]+$"),
+}
+
+
+class UserSearchPlan:
+    """How to run a user search: a query that Auth0 can run, if any part of
+    the search can be expressed as one, and the local filter that all
+    results must pass.
+
+    A search is a list of ``(term, fields)`` where a user matches if, for
+    every term, any of the fields contains the term, case insensitive.
+    Auth0 can't search by substring, so only terms that are a complete email
+    or user ID are sent to Auth0, as an exact match of any of their fields,
+    e.g. ``(email:"a@b.co" OR user_id:"a@b.co")`` for a term searched by
+    email and ID. Every other term, or a term searched by name, is only
+    matched locally.
+    """
+
+    def __init__(self, search: list[tuple[str, list[SearchField]]] | None):
+        self.__filters = [
+            (
+                term.casefold(),
+                tuple({"id" if field == "user_id" else field for field in fields}),
+            )
+            for term, fields in (search or [])
+        ]
+
+        clauses = []
+        for term, fields in search or []:
+            fields = {"id" if field == "user_id" else field for field in fields}
+            if not all(field in _AUTH0_FIELDS for field in fields) or not any(
+                _COMPLETE_VALUE_PATTERNS[field].match(term) for field in fields
+            ):
+                continue
+
+            clause = " OR ".join(f'{_AUTH0_FIELDS[field]}:"{term}"' for field in sorted(fields))
+            clauses.append(f"({clause})" if len(fields) > 1 else clause)
+
+        self.query = " AND ".join(clauses) or None
+
+    def __bool__(self):
+        return bool(self.__filters)
+
+    def matches(self, user: User) -> bool:
+        """Whether the user matches every term of the search."""
+        for term, fields in self.__filters:
+            if not any(term in (getattr(user, field) or "").casefold() for field in fields):
+                return False
+        return True
@@ -0,0 +1,151 @@
+"""
+| Copyright 2017-2024 Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import heapq
+import json
+import os
+import tempfile
+from typing import AsyncIterator, Literal
+
+from fiftyone_helpers import Organization, User
+
+
+def _sort_key(user: User, key: str) -> str:
+    return (getattr(user, key) or "").lower()
+
+
+def _to_record(user: User, key: str) -> str:
+    # Compact record of the user, the organization is kept separately as it's
+    # shared by the users.
+    return json.dumps(
+        [
+            _sort_key(user, key),
+            user.organization.id,
+            user.id,
+            user.email,
+            user.name,
+            user.picture,
+            user.role.value,
+            user.group_ids,
+        ],
+        separators=(",", ":"),
+    )
+
+
+def _from_record(record: list, organizations: dict[str, Organization]) -> User:
+    _, org_id, user_id, email, name, picture, role, group_ids = record
+    return User(
+        id=user_id,
+        organization=organizations[org_id],
+        email=email,
+        name=name,
+        picture=picture,
+        role=role,
+        group_ids=group_ids,
+    )
+
+
+async def sort_users(
+    users: AsyncIterator[User],
+    key: Literal["email", "name"],
+    /,
+    reverse: bool = False,
+    run_size: int = 10000,
+) -> AsyncIterator[User]:
+    """Sort users with at most ``run_size`` users in memory at a time.
+
+    Users are sorted in runs of ``run_size`` that are spilled to temporary
+    files, which are then merged back as a stream. If there are no more than
+    ``run_size`` users, they are sorted in memory.
+
+    Args:
+        users (AsyncIterator[User]): The users to sort.
+        key (str): The user field to sort by, case insensitive.
+        reverse (bool): Whether to sort in descending order.
+        run_size (int): The number of users per sorted run.
+
+    Yields:
+        User: The sorted users.
+    """
+    organizations = {}
+    run = []
+
+    with tempfile.TemporaryDirectory(prefix="user-sort-") as tmp_dir:
+        run_paths = []
+
+        async for user in users:
+            run.append(user)
+            if len(run) < run_size:
+                continue
+
+            run.sort(key=lambda user: _sort_key(user, key), reverse=reverse)
+
+            run_path = os.path.join(tmp_dir, f"{len(run_paths)}.jsonl")
+            with open(run_path, "w", encoding="utf-8") as f:
+                for user in run:
+                    organizations[user.organization.id] = user.organization
+                    f.write(_to_record(user, key) + "\n")
+
+            run_paths.append(run_path)
+            run = []
+
+        run.sort(key=lambda user: _sort_key(user, key), reverse=reverse)
+
+        if not run_paths:
+            for user in run:
+                yield user
+            return
+
+        # Merge the remaining in memory run with the spilled ones.
+        for user in run:
+            organizations[user.organization.id] = user.organization
+        last_run = [json.loads(_to_record(user, key)) for user in run]
+        del run
+
+        run_files = [open(run_path, encoding="utf-8") for run_path in run_paths]
+        try:
+            for record in heapq.merge(
+                *((json.loads(line) for line in run_file) for run_file in run_files),
+                last_run,
+                key=lambda record: record[0],
+                reverse=reverse,
+            ):
+                yield _from_record(record, organizations)
+        finally:
+            for run_file in run_files:
+                run_file.close()
+
+
+async def top_users(
+    users: AsyncIterator[User],
+    key: Literal["email", "name"],
+    limit: int,
+    /,
+    reverse: bool = False,
+) -> list[User]:
+    """Get the first ``limit`` users in order, with at most ``2 * limit``
+    users in memory at a time.
+
+    Args:
+        users (AsyncIterator[User]): The users to sort.
+        key (str): The user field to sort by, case insensitive.
+        limit (int): The number of users to return.
+        reverse (bool): Whether to sort in descending order.
+
+    Returns:
+        list[User]: The first ``limit`` sorted users.
+    """
+    select = heapq.nlargest if reverse else heapq.nsmallest
+
+    def sort_key(user):
+        return _sort_key(user, key)
+
+    top = []
+    async for user in users:
+        top.append(user)
+        if len(top) >= 2 * limit:
+            top = select(limit, top, key=sort_key)
+
+    return select(limit, top, key=sort_key)
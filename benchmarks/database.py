@@ -0,0 +1,214 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+Check of writing straight to the CAS database, ``migrate.py --cas-database``,
+against a local mongod::
+
+    docker run -d -p 27017:27017 mongo
+    python -m benchmarks.database --uri mongodb://localhost:27017 --users 100000
+
+Writes two synthetic organizations, sharing the same users, to a scratch
+database with `CasDatabaseClient`, twice, and checks that the second write
+updates the same documents, that each organization keeps its own members,
+that the users read back are unchanged for the delta of a next run, and the
+write throughput. The scratch database is dropped at the end.
+
+With ``--cas-url``, the documents are also compared with the ones a running
+CAS writes to its database, ``--cas-database`` of the same mongod, for a
+probe organization and user added through the CAS API, which are then
+deleted. Needs the migration settings in the environment, like
+``migrate.py``.
+"""
+# `cas_helpers` is imported in the functions, as it needs the migration settings.
+# pylint: disable=import-outside-toplevel
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+
+ORGANIZATION_IDS = ("org_database_check_a", "org_database_check_b")
+
+
+def user_payload(index: int) -> dict:
+    return {
+        "id": f"auth0|check{index:07d}",
+        "email": f"user{index}@check.example.com",
+        "name": f"Check User {index}",
+        "picture": None if index % 2 else f"https://check.example.com/avatars/{index}.png",
+        "role": "MEMBER",
+    }
+
+
+def differences(name: str, document: dict, expected: dict) -> list[str]:
+    """The differences of the fields and ID type of a document from the one
+    the migration writes."""
+    problems = []
+    if missing := sorted(set(expected) - set(document)):
+        problems.append(f"{name}: CAS documents have no {', '.join(missing)} field(s)")
+    if extra := sorted(set(document) - set(expected)):
+        problems.append(f"{name}: CAS documents have {', '.join(extra)} field(s) not written")
+    # Only organizations are written with their own IDs.
+    if expected["_id"] is not None and type(document["_id"]) is not type(expected["_id"]):
+        problems.append(f"{name}: CAS documents have {type(document['_id']).__name__} IDs")
+    return problems
+
+
+async def check_writes(args, database) -> list[str]:
+    """Write the synthetic organizations and users twice and check the
+    documents."""
+    from cas_helpers import CasDatabaseClient, add_users, list_users
+    from cas_helpers.database_client import ORGANIZATIONS_COLLECTION, USERS_COLLECTION
+    from fiftyone_helpers import Organization, User
+    from migration_helpers import UserChange, UserDeltaIndex
+
+    orgs = [
+        Organization(id=org_id, name=f"check-{i}", display_name=f"Database Check {i}")
+        for i, org_id in enumerate(ORGANIZATION_IDS)
+    ]
+    # The same users in every organization, with a different role in each.
+    users_by_org = {
+        org.id: [
+            User(**{**user_payload(index), "role": role}, organization=org)
+            for index in range(args.users)
+        ]
+        for org, role in zip(orgs, ("MEMBER", "COLLABORATOR"))
+    }
+    total = sum(len(users) for users in users_by_org.values())
+
+    problems = []
+    async with CasDatabaseClient(args.uri, args.scratch_database) as cas_client:
+        for org in orgs:
+            await cas_client.post(
+                "/orgs/", data={"id": org.id, "name": org.name, "displayName": ""}
+            )
+
+        for attempt in ("first", "second"):
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    add_users(cas_client, [dict(user) for user in users[i : i + args.batch_size]])
+                    for users in users_by_org.values()
+                    for i in range(0, len(users), args.batch_size)
+                )
+            )
+            elapsed = time.perf_counter() - start
+            print(f"  {attempt} write: {total / elapsed:,.0f} users/s")
+
+        collection = database[USERS_COLLECTION]
+        if (count := await collection.count_documents({})) != total:
+            problems.append(f"{count} user documents after writing {total} memberships twice")
+        if await collection.count_documents({"$expr": {"$eq": ["$createdAt", "$updatedAt"]}}):
+            problems.append("the second write didn't update updatedAt")
+
+        for org_id, users in users_by_org.items():
+            if await database[ORGANIZATIONS_COLLECTION].count_documents({"_id": org_id}) != 1:
+                problems.append(f"the document of organization '{org_id}' is missing")
+
+            # Each organization keeps its own members and roles, so a next
+            # run finds them all unchanged.
+            delta_index = UserDeltaIndex(await list_users(cas_client, org_id) or [])
+            for user in users:
+                delta_index.classify(user)
+            if changed := len(users) - delta_index.counts[UserChange.UNCHANGED]:
+                problems.append(
+                    f"{changed} users of '{org_id}' read back differ from the ones written"
+                )
+
+    return problems
+
+
+async def compare_with_cas(args, client) -> list[str]:
+    """Add a probe organization and user through the CAS API and compare the
+    documents CAS wrote with the ones the migration writes for them."""
+    from cas_helpers import CasClient
+    from cas_helpers.database_client import (ORGANIZATIONS_COLLECTION, TIMESTAMP_FIELDS,
+                                             USERS_COLLECTION, org_document, user_document)
+
+    probe = uuid.uuid4().hex[:12]
+    org_payload = {"id": f"org_probe{probe}", "name": f"probe{probe}", "displayName": "Probe"}
+    user = {**user_payload(0), "id": f"auth0|probe{probe}", "email": f"{probe}@probe.example.com"}
+
+    cas_database = client[args.cas_database]
+    async with CasClient(args.cas_url, args.cas_api_key) as cas_client:
+        await cas_client.post("/orgs/", data=org_payload)
+        await cas_client.post(
+            f"/orgs/{org_payload['id']}/users/",
+            data={key: value for key, value in user.items() if value is not None},
+        )
+
+    problems = []
+    for name, query, expected in (
+        (
+            ORGANIZATIONS_COLLECTION,
+            {"$or": [{"_id": org_payload["id"]}, {"id": org_payload["id"]}]},
+            org_document(org_payload),
+        ),
+        (
+            USERS_COLLECTION,
+            {"email": user["email"]},
+            {"_id": None, **user_document(org_payload["id"], user)},
+        ),
+    ):
+        expected.update((field, None) for field in TIMESTAMP_FIELDS)
+
+        found = None
+        for collection_name in await cas_database.list_collection_names():
+            if (document := await cas_database[collection_name].find_one(query)) is not None:
+                found = collection_name
+                await cas_database[collection_name].delete_one({"_id": document["_id"]})
+                break
+
+        if found is None:
+            problems.append(f"{name}: CAS wrote the probe to none of the collections")
+            continue
+        if found != name:
+            problems.append(f"{name}: CAS writes to the '{found}' collection")
+        problems.extend(differences(name, document, expected))
+
+    return problems
+
+
+async def main(args):
+    import motor.motor_asyncio
+
+    client = motor.motor_asyncio.AsyncIOMotorClient(args.uri)
+    try:
+        print(f"Writing {args.users} users to '{args.scratch_database}'...")
+        problems = await check_writes(args, client[args.scratch_database])
+        if args.cas_url:
+            print(f"Comparing with the documents CAS writes to '{args.cas_database}'...")
+            problems.extend(await compare_with_cas(args, client))
+    finally:
+        await client.drop_database(args.scratch_database)
+        client.close()
+
+    if problems:
+        print("==== Failed ====")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check writing straight to the CAS database against a local mongod"
+    )
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="the mongod URI")
+    parser.add_argument("--users", type=int, default=10000, help="number of users to write")
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="number of users per batch import"
+    )
+    parser.add_argument(
+        "--scratch-database",
+        default=f"migration_check_{uuid.uuid4().hex[:8]}",
+        help="database to write to, dropped at the end",
+    )
+    parser.add_argument("--cas-url", help="URL of a CAS using the same mongod, to compare with")
+    parser.add_argument("--cas-api-key", default="", help="API key of that CAS")
+    parser.add_argument("--cas-database", default="cas", help="database of that CAS")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,234 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+Offline benchmark of the migration.
+
+Runs ``migrate.py`` end to end against local stand-ins for Auth0 and CAS
+(see `benchmarks.servers`) for each organization size, and writes the
+throughput, per-stage p50/p99 latencies and peak RSS of each run to a JSON
+file::
+
+    python -m benchmarks.run --org-sizes 1000 100000 --output benchmark-results.json
+
+With ``--baseline``, exits with an error if the throughput of any run
+dropped by more than ``--max-regression`` compared to the baseline results.
+
+Requires the ``openssl`` CLI to create a certificate for the Auth0
+stand-in. No network access or Auth0 tenant is needed.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.servers import ORGANIZATION_ID, add_server_arguments
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stages to report latencies for, when present in the run report
+STAGES = (
+    "auth0.get_client",
+    "auth0.members_page",
+    "auth0.export_job",
+    "auth0.build_users",
+    "cas.add_user",
+    "cas.add_users",
+)
+
+
+def generate_certificate(directory: str) -> tuple[str, str]:
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+            "-keyout", key_path, "-out", cert_path,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert_path, key_path
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(("localhost", port), timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def run_benchmark(args, org_size: int, directory: str, cert_path: str, key_path: str) -> dict:
+    """Run the migration of a synthetic organization of ``org_size`` members."""
+    auth0_port, cas_port = free_port(), free_port()
+    report_path = os.path.join(directory, f"report-{org_size}.json")
+    log_path = os.path.join(directory, f"migrate-{org_size}.log")
+
+    env = {
+        **os.environ,
+        "AUTH0_AUDIENCE": f"https://localhost:{auth0_port}/api/v2/",
+        "AUTH0_DOMAIN": f"localhost:{auth0_port}",
+        "AUTH0_MGMT_CLIENT_ID": "benchmark",
+        "AUTH0_MGMT_CLIENT_SECRET": "benchmark",
+        "AUTH0_CLIENT_SECRET": "benchmark",
+        "AUTH0_ORGANIZATION": ORGANIZATION_ID,
+        "CAS_BASE_URL": f"http://localhost:{cas_port}",
+        "FIFTYONE_AUTH_SECRET": "benchmark",
+        "MIGRATION_JOURNAL_PATH": os.path.join(directory, f"journal-{org_size}.jsonl"),
+        # Trust the stand-in's certificate, for aiohttp and requests.
+        "SSL_CERT_FILE": cert_path,
+        "REQUESTS_CA_BUNDLE": cert_path,
+    }
+
+    server_args = [
+        "--org-size", str(org_size),
+        "--page-size", str(args.page_size),
+        "--auth0-latency", str(args.auth0_latency),
+        "--auth0-rate", str(args.auth0_rate),
+        "--auth0-burst", str(args.auth0_burst),
+        "--auth0-error-rate", str(args.auth0_error_rate),
+        "--auth0-totals", args.auth0_totals,
+        "--export-delay", str(args.export_delay),
+        "--cas-latency", str(args.cas_latency),
+        "--cas-error-rate", str(args.cas_error_rate),
+    ]
+    if not args.batch_import:
+        server_args.append("--no-batch")
+
+    servers = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.servers", *server_args,
+            "--auth0-port", str(auth0_port), "--cas-port", str(cas_port),
+            "--cert", cert_path, "--key", key_path,
+        ],
+        cwd=ROOT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(auth0_port)
+        wait_for_port(cas_port)
+
+        with open(log_path, "w", encoding="utf-8") as log:
+            migration = subprocess.Popen(
+                [sys.executable, "migrate.py", "--report", report_path, "--source", args.source],
+                cwd=ROOT_DIR,
+                env=env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+            # wait4 gives the resource usage of the migration process alone.
+            _, status, rusage = os.wait4(migration.pid, 0)
+            migration.returncode = os.waitstatus_to_exitcode(status)
+    finally:
+        servers.terminate()
+        servers.wait()
+
+    if migration.returncode != 0 or not os.path.exists(report_path):
+        with open(log_path, encoding="utf-8") as log:
+            print(log.read()[-2000:], file=sys.stderr)
+        raise RuntimeError(f"Migration of {org_size} members failed, see {log_path}")
+
+    with open(report_path, encoding="utf-8") as f:
+        report = json.load(f)
+
+    return {
+        "org_size": org_size,
+        "parameters": {
+            key: value for key, value in vars(args).items()
+            if key not in ("org_size", "org_sizes", "output", "baseline", "max_regression")
+        },
+        "users_migrated": report["counters"].get("users.migrated", 0),
+        "elapsed_seconds": report["elapsed_seconds"],
+        "users_per_second": report["users_per_second"],
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(rusage.ru_maxrss / 1024, 1),
+        "latency_seconds": {
+            stage: {"p50": report["stages"][stage]["p50"], "p99": report["stages"][stage]["p99"]}
+            for stage in STAGES
+            if stage in report["stages"]
+        },
+        "counters": report["counters"],
+    }
+
+
+def find_regressions(results: list[dict], baseline: list[dict], max_regression: float) -> list[str]:
+    baseline_by_size = {result["org_size"]: result for result in baseline}
+
+    regressions = []
+    for result in results:
+        if (previous := baseline_by_size.get(result["org_size"])) is None:
+            continue
+
+        minimum = previous["users_per_second"] * (1 - max_regression)
+        if result["users_per_second"] < minimum:
+            regressions.append(
+                f"{result['org_size']} members: {result['users_per_second']} users/s, "
+                f"baseline {previous['users_per_second']} users/s"
+            )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the migration against local stand-ins for Auth0 and CAS"
+    )
+    parser.add_argument("--org-sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="synthetic organization sizes to benchmark")
+    add_server_arguments(parser)
+    parser.add_argument("--source", choices=["members", "export"], default="members",
+                        help="where the migration reads the Auth0 users from")
+    parser.add_argument("--output", default="benchmark-results.json",
+                        help="path of the JSON results")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed fractional drop in users/s compared to the baseline")
+    parser.set_defaults(org_size=None)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="migration-benchmark-") as directory:
+        cert_path, key_path = generate_certificate(directory)
+        for org_size in args.org_sizes:
+            print(f"Benchmarking {org_size} members...")
+            result = run_benchmark(args, org_size, directory, cert_path, key_path)
+            print(
+                f"  {result['users_per_second']} users/s, "
+                f"{result['elapsed_seconds']}s, peak RSS {result['peak_rss_mb']} MB"
+            )
+            results.append(result)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"results": results}, f, indent=2)
+    print(f"Results written to '{args.output}'")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+        if regressions := find_regressions(results, baseline, args.max_regression):
+            print("==== Regression ====")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+Local stand-ins for the Auth0 Management API and CAS used by the benchmarks.
+
+The Auth0 stand-in serves a synthetic organization of any size, generating
+members on the fly from their index, with checkpoint pagination, latency, a
+token bucket rate limit answering 429s with ``Retry-After`` and error rates::
+
+    python -m benchmarks.servers --org-size 100000 --auth0-port 8443 --cas-port 8000 \\
+        --cert cert.pem --key key.pem
+
+It also runs users export jobs of the organization's connection, which
+complete after ``export_delay`` seconds and are downloaded as gzipped NDJSON
+generated on the fly, with tenant users that aren't members mixed in.
+
+The Auth0 client only speaks HTTPS, so the Auth0 stand-in needs a
+certificate. CAS is served over plain HTTP.
+"""
+import argparse
+import asyncio
+import json
+import random
+import ssl
+import time
+import zlib
+
+from aiohttp import web
+
+ORGANIZATION_ID = "org_benchmark"
+CONNECTION_ID = "con_benchmark"
+# Tenant users that aren't members of the organization, per member
+NON_MEMBER_RATIO = 0.1
+ROLES = ("ADMIN", "MEMBER", "MEMBER", "MEMBER", "COLLABORATOR", "GUEST")
+
+
+class TokenBucket:
+    """Auth0 style rate limit: ``limit`` requests of burst, refilled at
+    ``rate`` requests per second."""
+
+    def __init__(self, rate: float, limit: int):
+        self.rate = rate
+        self.limit = limit
+        self.tokens = float(limit)
+        self.updated_at = time.monotonic()
+
+    def take(self) -> tuple[bool, dict[str, str]]:
+        now = time.monotonic()
+        self.tokens = min(self.limit, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        allowed = self.tokens >= 1
+        if allowed:
+            self.tokens -= 1
+
+        reset_at = time.time() + (self.limit - self.tokens) / self.rate
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(int(self.tokens)),
+            "X-RateLimit-Reset": str(int(reset_at) + 1),
+        }
+        if not allowed:
+            headers["Retry-After"] = str(max(1, int((1 - self.tokens) / self.rate + 0.999)))
+
+        return allowed, headers
+
+
+def synthetic_member(index: int) -> dict:
+    role = ROLES[index % len(ROLES)]
+    return {
+        "user_id": f"auth0|benchmark{index:07d}",
+        "email": f"user{index}@benchmark.example.com",
+        "name": f"Benchmark User {index}",
+        "picture": f"https://benchmark.example.com/avatars/{index}.png",
+        "roles": [{"id": f"rol_{role}", "name": role}],
+    }
+
+
+def create_auth0_app(
+    org_size: int,
+    /,
+    page_size: int = 100,
+    latency: float = 0.0,
+    rate: float = 50.0,
+    burst: int = 100,
+    error_rate: float = 0.0,
+    export_delay: float = 1.0,
+    totals: str = "full",
+) -> web.Application:
+    """Create the stand-in Auth0 application.
+
+    Args:
+        org_size (int): Number of members of the synthetic organization.
+        page_size (int): Maximum number of members per page.
+        latency (float): Seconds to wait before answering each request.
+        rate (float): Management API requests per second before 429s.
+        burst (int): Size of the rate limit bucket.
+        error_rate (float): Fraction of Management API requests to fail with
+            a 503.
+        export_delay (float): Seconds for a users export job to complete.
+        totals (str): Member totals of ``include_totals`` responses:
+            ``full``, ``missing`` to leave them out or ``page`` to cap them
+            to the page, like Auth0 may.
+
+    Returns:
+        web.Application: The application. The number of requests per route
+            is kept in ``app["requests"]``.
+    """
+    app = web.Application()
+    app["requests"] = {}
+    app["roles"] = {f"rol_{role}": {"id": f"rol_{role}", "name": role} for role in set(ROLES)}
+    app["jobs"] = {}
+    bucket = TokenBucket(rate, burst)
+
+    @web.middleware
+    async def simulate(request, handler):
+        route = request.match_info.route.resource
+        name = route.canonical if route is not None else request.path
+        app["requests"][name] = app["requests"].get(name, 0) + 1
+
+        if latency:
+            await asyncio.sleep(latency)
+
+        if not request.path.startswith("/api/v2/"):
+            return await handler(request)
+
+        allowed, headers = bucket.take()
+        if not allowed:
+            return web.json_response(
+                {"statusCode": 429, "error": "Too Many Requests", "message": "Rate limited"},
+                status=429,
+                headers=headers,
+            )
+
+        if random.random() < error_rate:
+            return web.json_response(
+                {"statusCode": 503, "error": "Service Unavailable", "message": "Injected error"},
+                status=503,
+                headers=headers,
+            )
+
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    app.middlewares.append(simulate)
+
+    async def get_token(_):
+        return web.json_response(
+            {"access_token": "benchmark", "expires_in": 86400, "token_type": "Bearer"}
+        )
+
+    async def get_organization(request):
+        org_id = request.match_info["org_id"]
+        return web.json_response(
+            {"id": org_id, "name": "benchmark", "display_name": "Benchmark Organization"}
+        )
+
+    async def list_members(request):
+        query = request.query
+        if "from" in query or "take" in query:
+            start = int(query.get("from") or 0)
+            take = min(int(query.get("take") or 50), page_size)
+        else:
+            per_page = min(int(query.get("per_page") or 50), page_size)
+            start = int(query.get("page") or 0) * per_page
+            take = per_page
+
+        members = [synthetic_member(i) for i in range(start, min(start + take, org_size))]
+        if fields := query.get("fields"):
+            fields = fields.split(",")
+            members = [{field: member[field] for field in fields} for member in members]
+
+        if "from" in query or "take" in query:
+            body = {"members": members}
+            if start + take < org_size:
+                body["next"] = str(start + take)
+        elif query.get("include_totals") == "true":
+            body = {"members": members, "start": start, "limit": take}
+            if totals == "full":
+                body["total"] = org_size
+            elif totals == "page":
+                body["total"] = len(members)
+        else:
+            body = members
+
+        return web.json_response(body)
+
+    async def list_member_roles(request):
+        user_id = request.match_info["user_id"]
+        index = int(user_id.removeprefix("auth0|benchmark"))
+        return web.json_response(synthetic_member(index)["roles"])
+
+    async def list_roles(_):
+        roles = list(app["roles"].values())
+        return web.json_response({"roles": roles, "start": 0, "limit": 50, "total": len(roles)})
+
+    async def create_role(request):
+        body = await request.json()
+        role = {"id": f"rol_{body['name']}", **body}
+        app["roles"][role["id"]] = role
+        return web.json_response(role, status=201)
+
+    async def list_connections(request):
+        if int(request.query.get("page") or 0) > 0:
+            return web.json_response([])
+        return web.json_response(
+            [
+                {
+                    "connection_id": CONNECTION_ID,
+                    "assign_membership_on_login": False,
+                    "connection": {"name": "Username-Password-Authentication", "strategy": "auth0"},
+                }
+            ]
+        )
+
+    async def create_users_export(request):
+        body = await request.json()
+        job_id = f"job_{len(app['jobs'])}"
+        app["jobs"][job_id] = {
+            "connection_id": body["connection_id"],
+            "fields": [field["name"] for field in body.get("fields", [])],
+            "completes_at": time.monotonic() + export_delay,
+        }
+        return web.json_response(
+            {"id": job_id, "type": "users_export", "status": "pending", **body}, status=201
+        )
+
+    async def get_job(request):
+        job_id = request.match_info["job_id"]
+        if (job := app["jobs"].get(job_id)) is None:
+            return web.json_response({"statusCode": 404, "message": "Not found"}, status=404)
+
+        body = {"id": job_id, "type": "users_export", "connection_id": job["connection_id"]}
+        if time.monotonic() < job["completes_at"]:
+            body["status"] = "processing"
+        else:
+            body["status"] = "completed"
+            body["location"] = f"{request.scheme}://{request.host}/exports/{job_id}.json.gz"
+        return web.json_response(body)
+
+    async def download_export(request):
+        job = app["jobs"][request.match_info["job_id"]]
+        fields = job["fields"] or ["user_id", "email", "name", "picture"]
+
+        response = web.StreamResponse(headers={"Content-Type": "application/gzip"})
+        await response.prepare(request)
+
+        # Members and the tenant's other users, in no particular order.
+        indexes = list(range(org_size + int(org_size * NON_MEMBER_RATIO)))
+        random.shuffle(indexes)
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for start in range(0, len(indexes), 1000):
+            lines = "".join(
+                json.dumps({field: synthetic_member(i)[field] for field in fields}) + "\n"
+                for i in indexes[start : start + 1000]
+            )
+            await response.write(compressor.compress(lines.encode("utf-8")))
+        await response.write(compressor.flush())
+        await response.write_eof()
+        return response
+
+    app.router.add_post("/oauth/token", get_token)
+    app.router.add_get("/api/v2/organizations/{org_id}", get_organization)
+    app.router.add_get("/api/v2/organizations/{org_id}/members", list_members)
+    app.router.add_get(
+        "/api/v2/organizations/{org_id}/members/{user_id}/roles", list_member_roles
+    )
+    app.router.add_get("/api/v2/roles", list_roles)
+    app.router.add_post("/api/v2/roles", create_role)
+    app.router.add_get(
+        "/api/v2/organizations/{org_id}/enabled_connections", list_connections
+    )
+    app.router.add_post("/api/v2/jobs/users-exports", create_users_export)
+    app.router.add_get("/api/v2/jobs/{job_id}", get_job)
+    app.router.add_get("/exports/{job_id}.json.gz", download_export)
+
+    return app
+
+
+async def serve(args):
+    # Imported here as importing `cas_helpers` needs the migration settings in
+    # the environment, which the benchmark runner only sets for its children.
+    from cas_helpers.stub_server import create_app as create_cas_app
+
+    ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ssl_context.load_cert_chain(args.cert, args.key)
+
+    auth0_runner = web.AppRunner(
+        create_auth0_app(
+            args.org_size,
+            page_size=args.page_size,
+            latency=args.auth0_latency,
+            rate=args.auth0_rate,
+            burst=args.auth0_burst,
+            error_rate=args.auth0_error_rate,
+            export_delay=args.export_delay,
+            totals=args.auth0_totals,
+        )
+    )
+    cas_runner = web.AppRunner(
+        create_cas_app(
+            batch_import=args.batch_import,
+            latency=args.cas_latency,
+            error_rate=args.cas_error_rate,
+        )
+    )
+
+    await auth0_runner.setup()
+    await cas_runner.setup()
+    await web.TCPSite(auth0_runner, args.host, args.auth0_port, ssl_context=ssl_context).start()
+    await web.TCPSite(cas_runner, args.host, args.cas_port).start()
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await auth0_runner.cleanup()
+        await cas_runner.cleanup()
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the stand-in server options, shared with the benchmark runner."""
+    parser.add_argument("--org-size", type=int, default=10000,
+                        help="number of members of the synthetic organization")
+    parser.add_argument("--page-size", type=int, default=100,
+                        help="maximum number of members per Auth0 page")
+    parser.add_argument("--auth0-latency", type=float, default=0.05,
+                        help="seconds to wait before answering each Auth0 request")
+    parser.add_argument("--auth0-rate", type=float, default=50,
+                        help="Auth0 Management API requests per second before 429s")
+    parser.add_argument("--auth0-burst", type=int, default=100,
+                        help="Auth0 Management API rate limit bucket size")
+    parser.add_argument("--auth0-error-rate", type=float, default=0.0,
+                        help="fraction of Auth0 Management API requests to fail with a 503")
+    parser.add_argument("--auth0-totals", choices=("full", "missing", "page"), default="full",
+                        help="member totals reported by Auth0: full, missing, or capped to "
+                        "the page")
+    parser.add_argument("--export-delay", type=float, default=1.0,
+                        help="seconds for an Auth0 users export job to complete")
+    parser.add_argument("--cas-latency", type=float, default=0.01,
+                        help="seconds to wait before answering each CAS request")
+    parser.add_argument("--cas-error-rate", type=float, default=0.0,
+                        help="fraction of CAS writes to fail with a 503")
+    parser.add_argument("--no-batch", dest="batch_import", action="store_false",
+                        help="don't serve the CAS batch import endpoint")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-ins for Auth0 and CAS")
+    add_server_arguments(parser)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--auth0-port", type=int, default=8443)
+    parser.add_argument("--cas-port", type=int, default=8000)
+    parser.add_argument("--cert", required=True, help="TLS certificate for the Auth0 stand-in")
+    parser.add_argument("--key", required=True, help="TLS key for the Auth0 stand-in")
+
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -1,2 +1,6 @@
-from cas_helpers.cas_methods import (add_org, add_user, get_auth_mode,
-                                     get_existing_auth_config)
+from cas_helpers.cas_client import CasClient, CasError
+from cas_helpers.cas_methods import (add_org, add_user, add_users, get_auth_mode,
+                                     get_existing_auth_config, list_users,
+                                     supports_batch_import)
+from cas_helpers.concurrency import AdaptiveConcurrencyLimiter
+from cas_helpers.database_client import CasDatabaseClient
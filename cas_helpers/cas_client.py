@@ -0,0 +1,194 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import asyncio
+import random
+import time
+from typing import Any
+
+import aiohttp
+from cas_helpers.concurrency import AdaptiveConcurrencyLimiter
+from config import Config
+from migration_helpers.metrics import metrics
+
+# Statuses that are worth retrying, anything else >= 400 fails right away.
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+RETRY_EXCEPTIONS = (
+    aiohttp.ClientConnectionError,
+    aiohttp.ClientPayloadError,
+    asyncio.TimeoutError,
+)
+# Methods of the write path, whose concurrency is adjusted to the load of CAS.
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+class CasError(Exception):
+    """A request to CAS failed"""
+
+    def __init__(self, method: str, path: str, status: int | None, message: str):
+        super().__init__(
+            f"{method} {path} failed"
+            + (f" with status {status}" if status is not None else "")
+            + (f": {message}" if message else "")
+        )
+        self.status = status
+
+
+class CasClient:
+    """Client for the Central Auth Service (CAS) API.
+
+    Uses one long-lived session with a pool of keep-alive connections for all
+    requests, and retries requests that fail with a 429, 5xx or connection
+    error with jittered exponential backoff. The number of writes in flight
+    is adjusted to the latency and error rate of CAS, see
+    `AdaptiveConcurrencyLimiter`.
+
+    Use as an async context manager::
+
+        async with CasClient() as cas_client:
+            status, body = await cas_client.request("GET", "/config/mode/")
+    """
+
+    def __init__(
+        self,
+        base_url: str = Config.CAS_BASE_URL,
+        api_key: str = Config.FIFTYONE_AUTH_SECRET,
+        /,
+        connection_limit: int = Config.CAS_CONNECTION_LIMIT,
+        max_retries: int = Config.MAX_HTTP_RETRIES,
+        timeout: float = 60,
+        write_limiter: AdaptiveConcurrencyLimiter | None = None,
+    ):
+        self.__base_url = base_url.rstrip("/")
+        self.__headers = {"X-API-KEY": api_key}
+        self.__connection_limit = connection_limit
+        self.__max_retries = max_retries
+        self.__timeout = timeout
+        self.__write_limiter = write_limiter or AdaptiveConcurrencyLimiter(
+            Config.CAS_CONCURRENCY,
+            floor=Config.CAS_CONCURRENCY_MIN,
+            ceiling=Config.CAS_CONCURRENCY_MAX,
+        )
+
+        self.__session: aiohttp.ClientSession | None = None
+
+    @property
+    def write_limiter(self) -> AdaptiveConcurrencyLimiter:
+        return self.__write_limiter
+
+    async def __aenter__(self) -> "CasClient":
+        connector = aiohttp.TCPConnector(
+            limit=self.__connection_limit,
+            limit_per_host=self.__connection_limit,
+            keepalive_timeout=60,
+            ttl_dns_cache=300,
+        )
+        self.__session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.__headers,
+            timeout=aiohttp.ClientTimeout(total=self.__timeout),
+        )
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def close(self) -> None:
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        /,
+        check: bool = True,
+        retries: int | None = None,
+        timeout: float | None = None,
+        **kwargs,
+    ) -> tuple[int, Any]:
+        """Send a request to CAS.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path relative to the CAS base URL.
+            check (bool): Whether to raise for an error status.
+            retries (int | None): Maximum number of retries. Defaults to
+                ``max_retries`` of the client.
+            timeout (float | None): Seconds before each attempt times out.
+                Defaults to ``timeout`` of the client.
+            **kwargs: Passed on to `aiohttp.ClientSession.request`.
+
+        Returns:
+            tuple[int, Any]: The status and the JSON, or text if not JSON,
+                response body.
+
+        Raises:
+            CasError: If ``check`` and the request failed, or it could not be
+                sent after all retries.
+        """
+        if retries is None:
+            retries = self.__max_retries
+
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+
+        limiter = self.__write_limiter if method in WRITE_METHODS else None
+
+        attempt = 0
+        while True:
+            retry_after = None
+            if limiter is not None:
+                await limiter.acquire()
+            overloaded = True
+            start = time.perf_counter()
+            try:
+                async with self.__session.request(
+                    method, f"{self.__base_url}{path}", **kwargs
+                ) as resp:
+                    status = resp.status
+                    overloaded = status in RETRY_STATUSES
+                    if status == 429:
+                        metrics.increment("cas.rate_limited")
+
+                    if not overloaded or attempt >= retries:
+                        body = await self.__read_body(resp)
+                        if check and status >= 400:
+                            raise CasError(method, path, status, str(body)[:200])
+                        return status, body
+
+                    retry_after = resp.headers.get("Retry-After")
+            except RETRY_EXCEPTIONS as err:
+                if attempt >= retries:
+                    raise CasError(method, path, None, repr(err)) from err
+            finally:
+                if limiter is not None:
+                    limiter.release(time.perf_counter() - start, overloaded)
+
+            attempt += 1
+            metrics.increment("cas.retries")
+            await asyncio.sleep(self.__retry_delay(attempt, retry_after))
+
+    async def get(self, path: str, /, **kwargs) -> tuple[int, Any]:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, /, **kwargs) -> tuple[int, Any]:
+        return await self.request("POST", path, **kwargs)
+
+    @staticmethod
+    async def __read_body(resp):
+        if resp.content_type == "application/json":
+            return await resp.json()
+        return await resp.text()
+
+    @staticmethod
+    def __retry_delay(attempt, retry_after):
+        # Full jitter, so that concurrent writers don't retry in lockstep.
+        delay = random.uniform(0, min(30.0, 0.5 * 2**attempt))
+        try:
+            return max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            return delay
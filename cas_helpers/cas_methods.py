@@ -1,71 +1,143 @@
-import aiohttp
+import logging
+
+from cas_helpers.cas_client import CasError
 from config import Config
+from migration_helpers.metrics import metrics
 
-CAS_BASE_URL = Config.CAS_BASE_URL
-HEADERS = {"X-API-KEY": Config.FIFTYONE_AUTH_SECRET}
+logger = logging.getLogger(__name__)
 
 
-async def add_org(session, org_data):
-    print("Adding Organization...")
-    async with session.post(f"{CAS_BASE_URL}/orgs/", headers=HEADERS, data={
+async def add_org(cas_client, org_data):
+    logger.info("Adding Organization...")
+    with metrics.timed("cas.add_org"):
+        status, body = await cas_client.post("/orgs/", check=False, data=_form({
             "id": org_data["id"],
             "name": org_data["name"],
             "displayName": org_data["display_name"],
             "pypiToken": org_data["pypi_token"],
-            "isDefault": True
-            }) as resp:
-        ...
-    print(f"Added Organization {org_data['name']}")
+            # CAS has a single default organization.
+            "isDefault": org_data["id"] == Config.DEFAULT_ORGANIZATION_ID
+            }))
+
+    # Reruns, resumed runs and parallel imports all add the organization
+    # again.
+    if status == 409 or (400 <= status < 500 and "already exists" in str(body).lower()):
+        logger.info(f"Organization {org_data['name']} already exists")
+        return
+    if status >= 400:
+        raise CasError("POST", "/orgs/", status, str(body)[:200])
+
+    logger.info(f"Added Organization {org_data['name']}")
 
-async def add_user(session, user_data):
+def _form(payload):
+    # Form fields are strings, leave out missing values rather than send
+    # "None".
+    return {key: value for key, value in payload.items() if value is not None}
+
+def _user_payload(user_data):
+    return {
+        "id": user_data["id"],
+        "email": user_data["email"],
+        "name": user_data["name"],
+        "picture": user_data.get("picture"),
+        "role": user_data["role"]
+    }
+
+async def add_user(cas_client, user_data):
     org_id = user_data["organization"].id
-    print("Adding User...")
-    async with session.post(f"{CAS_BASE_URL}/orgs/{org_id}/users/", headers=HEADERS, data={
-            "id": user_data["id"],
-            "email": user_data["email"],
-            "name": user_data["name"],
-            "picture": user_data.get("picture"),
-            "role": user_data["role"]
-            }) as resp:
-          print(f"Added User {user_data['email']}")
-
-async def get_auth_mode(session):
+    logger.debug("Adding User...")
+    with metrics.timed("cas.add_user"):
+        await cas_client.post(f"/orgs/{org_id}/users/", data=_form(_user_payload(user_data)))
+    # Per user, so only formatted if debug messages are logged.
+    logger.debug("Added User %s", user_data["email"])
+
+async def add_users(cas_client, users_data):
+    """Add a batch of users of the same organization in a single request.
+
+    Only use this if `supports_batch_import` is true for the organization,
+    otherwise use `add_user` for each user.
+    """
+    org_id = users_data[0]["organization"].id
+    logger.debug("Adding %d Users...", len(users_data))
+    with metrics.timed("cas.add_users"):
+        await cas_client.post(f"/orgs/{org_id}/users/batch/",
+                              json=[_user_payload(user_data) for user_data in users_data])
+    logger.debug("Added %d Users", len(users_data))
+
+async def supports_batch_import(cas_client, org_id):
+    # Probe with an empty batch, older versions of CAS don't have the batch
+    # endpoint and respond with a 404 or 405.
+    try:
+        status, _ = await cas_client.post(f"/orgs/{org_id}/users/batch/", json=[], check=False)
+        return status in (200, 201, 204)
+    except CasError:
+        return False
+
+async def list_users(cas_client, org_id):
+    """Get the users of an organization currently in CAS.
+
+    The users are read in a single, unpaginated request, with its own
+    timeout as it grows with the organization. Returns None if the users
+    could not be listed, or not as a plain list of users, so that all users
+    are written instead.
+    """
     try:
-        async with session.get(f"{CAS_BASE_URL}/config/mode/", headers=HEADERS) as resp:
-            if resp.status != 200:
-                return None
-
-            auth_mode = await resp.json()
-            return auth_mode["mode"]
-    except aiohttp.client_exceptions.ClientConnectorError as e:
-        print("Unable to connect to CAS with ERROR: ", e, "\n")
+        with metrics.timed("cas.list_users"):
+            status, users = await cas_client.get(
+                f"/orgs/{org_id}/users/",
+                check=False,
+                retries=Config.CAS_LIST_USERS_RETRIES,
+                timeout=Config.CAS_LIST_USERS_TIMEOUT,
+            )
+    except CasError as err:
+        logger.warning("Unable to list the users of '%s' in CAS: %s", org_id, err)
         return None
 
-async def get_existing_auth_config(session):
-    async with session.get(f"{CAS_BASE_URL}/config/", headers=HEADERS) as resp:
-        # check if this looks like an auto imported auth0 config
-        if resp.status == 200:
-            info = await resp.json()
-            for provider in info["authenticationProviders"]:
-                id = provider["id"] 
-                org = provider["authorization"]["params"]["organization"]
-                # if the id matches our auto generated and the org id
-                # matches the existing auth0 org id, this is the 
-                # associated one created automatically and can be used.
-                # otherwise, we  want to warn the user to review
-                # their auth config
-
-                # check the auth0 client secret:
-                client_secret = provider["clientSecret"]
-                if client_secret != Config.CLIENT_SECRET:
-                    print("==== Warning ====")
-                    print("Please note that the currently configured clientSecret")
-                    print("is the management secret. This should be updated to")
-                    print("use the auth secret. This can be referenced in the")
-                    print("environment variable `AUTH0_CLIENT_SECRET`")
-                    print("This value should be updated for users to log in")
-
-                if id == "auth0" and org == Config.ORGANIZATION_ID:
-                    return True
-        return False
+    if status != 200 or not isinstance(users, list):
+        logger.warning(
+            "Unable to list the users of '%s' in CAS: status %s, %s",
+            org_id, status, type(users).__name__,
+        )
+        return None
+
+    return users
+
+async def get_auth_mode(cas_client):
+    try:
+        status, auth_mode = await cas_client.get("/config/mode/", check=False, retries=0)
+        if status != 200:
+            return None
+
+        return auth_mode["mode"]
+    except CasError as e:
+        logger.error(f"Unable to connect to CAS with ERROR: {e}")
+        return None
+
+async def get_existing_auth_config(cas_client):
+    status, info = await cas_client.get("/config/", check=False)
+    # check if this looks like an auto imported auth0 config
+    if status == 200:
+        for provider in info["authenticationProviders"]:
+            id = provider["id"] 
+            org = provider["authorization"]["params"]["organization"]
+            # if the id matches our auto generated and the org id
+            # matches the existing auth0 org id, this is the 
+            # associated one created automatically and can be used.
+            # otherwise, we  want to warn the user to review
+            # their auth config
+
+            # check the auth0 client secret:
+            client_secret = provider["clientSecret"]
+            if client_secret != Config.CLIENT_SECRET:
+                logger.warning(
+                    "Please note that the currently configured clientSecret\n"
+                    "is the management secret. This should be updated to\n"
+                    "use the auth secret. This can be referenced in the\n"
+                    "environment variable `AUTH0_CLIENT_SECRET`\n"
+                    "This value should be updated for users to log in"
+                )
+
+            if id == "auth0" and org in Config.ORGANIZATION_IDS:
+                return True
+    return False
 
@@ -0,0 +1,141 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import asyncio
+import collections
+import time
+
+from migration_helpers.metrics import metrics
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limit of in-flight requests adjusted by additive increase,
+    multiplicative decrease (AIMD), between a floor and a ceiling.
+
+    Every request that succeeds in reasonable time while the limit is in use
+    raises the limit by ``1 / limit``, so by about one per round of
+    ``limit`` requests. A request that is overloaded, i.e. answered with a
+    429 or 5xx or timed out, or a latency above ``LATENCY_TOLERANCE`` times
+    the baseline latency, lowers the limit by ``DECREASE_FACTOR``, at most
+    once per round trip so that a burst of errors from the same round counts
+    once.
+
+    Use as::
+
+        await limiter.acquire()
+        try:
+            ...
+        finally:
+            limiter.release(latency, overloaded)
+    """
+
+    DECREASE_FACTOR = 0.7
+    # Latency, relative to the baseline, taken as a sign of overload.
+    LATENCY_TOLERANCE = 2.5
+    # Number of recent requests the error rate is computed over.
+    WINDOW = 100
+
+    def __init__(self, initial: int, /, floor: int = 1, ceiling: int | None = None):
+        self.__floor = max(1, floor)
+        self.__ceiling = max(self.__floor, ceiling if ceiling is not None else initial)
+        self.__limit = float(min(max(initial, self.__floor), self.__ceiling))
+
+        self.__in_flight = 0
+        self.__waiters: collections.deque[asyncio.Future] = collections.deque()
+
+        self.__latency: float | None = None
+        self.__baseline_latency: float | None = None
+        self.__outcomes: collections.deque[bool] = collections.deque(maxlen=self.WINDOW)
+        self.__decreased_at = 0.0
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self.__limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self.__in_flight
+
+    @property
+    def latency(self) -> float | None:
+        """Moving average of the latency of successful requests in seconds."""
+        return self.__latency
+
+    @property
+    def error_rate(self) -> float:
+        """Fraction of the recent requests that were overloaded."""
+        if not self.__outcomes:
+            return 0.0
+        return sum(self.__outcomes) / len(self.__outcomes)
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        if not self.__waiters and self.__in_flight < self.limit:
+            self.__in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.__waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait was cancelled.
+                self.__in_flight -= 1
+                self.__wake()
+            else:
+                self.__waiters.remove(waiter)
+            raise
+
+    def release(self, latency: float, overloaded: bool) -> None:
+        """Give back the slot of a finished request and adjust the limit to
+        its outcome.
+
+        Args:
+            latency (float): The duration of the request in seconds.
+            overloaded (bool): Whether the request was rejected or failed
+                because of load, e.g. a 429, 5xx or timeout.
+        """
+        saturated = self.__in_flight >= self.limit
+        self.__in_flight -= 1
+        self.__outcomes.append(overloaded)
+
+        if not overloaded:
+            if self.__latency is None:
+                self.__latency = latency
+            else:
+                self.__latency = 0.9 * self.__latency + 0.1 * latency
+            # The baseline follows the lowest latencies and only drifts up
+            # slowly, in case CAS got permanently slower.
+            if self.__baseline_latency is None or latency < self.__baseline_latency:
+                self.__baseline_latency = latency
+            else:
+                self.__baseline_latency += 0.001 * (self.__latency - self.__baseline_latency)
+
+        congested = overloaded or (
+            self.__latency > self.LATENCY_TOLERANCE * self.__baseline_latency
+        )
+
+        now = time.monotonic()
+        if congested:
+            if now - self.__decreased_at >= (self.__latency or 0.0):
+                limit = max(self.__floor, self.__limit * self.DECREASE_FACTOR)
+                if int(limit) < self.limit:
+                    metrics.increment("cas.concurrency_decreases")
+                self.__limit = limit
+                self.__decreased_at = now
+        elif saturated:
+            # Only grow while the limit is what holds requests back.
+            self.__limit = min(self.__ceiling, self.__limit + 1 / self.__limit)
+
+        self.__wake()
+
+    def __wake(self):
+        while self.__waiters and self.__in_flight < self.limit:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                self.__in_flight += 1
+                waiter.set_result(None)
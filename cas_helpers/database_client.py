@@ -0,0 +1,339 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import asyncio
+import datetime
+import enum
+import logging
+import re
+import time
+from typing import Any
+
+from cas_helpers.cas_client import CasError
+from cas_helpers.concurrency import AdaptiveConcurrencyLimiter
+from config import Config
+from migration_helpers.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# The collections and documents below are not taken from CAS's own models,
+# which aren't available to this repository, they're unverified guesses. The
+# fields are those of the CAS API payloads, see `cas_methods`.
+# `CasDatabaseClient.check_schema` compares them with the documents CAS
+# already wrote to the database, and `benchmarks.database` with the ones a
+# running CAS writes.
+ORGANIZATIONS_COLLECTION = "organizations"
+USERS_COLLECTION = "users"
+# Fields identifying a document, that it's upserted by. A user has a
+# document per organization it's a member of.
+ORGANIZATION_KEY = ("_id",)
+USER_KEY = ("orgId", "userId")
+# Set on insert and on every write, respectively
+TIMESTAMP_FIELDS = ("createdAt", "updatedAt")
+
+_ORGS_PATH = re.compile(r"^/orgs/$")
+_ORG_USERS_PATH = re.compile(r"^/orgs/(?P<org_id>[^/]+)/users/$")
+_ORG_USERS_BATCH_PATH = re.compile(r"^/orgs/(?P<org_id>[^/]+)/users/batch/$")
+
+
+def _retry_exceptions():
+    # Only imported when writing to the database, not for the CAS API.
+    import pymongo.errors  # pylint: disable=import-outside-toplevel
+
+    # Errors of a busy or failing over deployment, worth retrying
+    return (
+        pymongo.errors.AutoReconnect,
+        pymongo.errors.ExecutionTimeout,
+        pymongo.errors.WaitQueueTimeoutError,
+    )
+
+
+def org_document(payload: dict[str, Any]) -> dict[str, Any]:
+    """The document of an organization, from its CAS API payload, without
+    its timestamps."""
+    return {
+        "_id": payload["id"],
+        "name": payload["name"],
+        "displayName": payload["displayName"],
+        "pypiToken": payload.get("pypiToken"),
+        "isDefault": payload.get("isDefault", False) in (True, "true", "True"),
+    }
+
+
+def user_document(org_id: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """The document of a user's membership of an organization, from its CAS
+    API payload, without its ID and timestamps."""
+    role = payload["role"]
+    return {
+        "orgId": org_id,
+        "userId": payload["id"],
+        "email": payload["email"],
+        "name": payload.get("name"),
+        "picture": payload.get("picture"),
+        "role": role.value if isinstance(role, enum.Enum) else role,
+    }
+
+
+class CasDatabaseClient:
+    """Client that writes organizations and users straight to the CAS
+    internal mode database, instead of through the CAS API.
+
+    It answers the CAS API requests of the migration, see `cas_methods`, so
+    it can be used in place of `CasClient`. Writes are idempotent upserts,
+    of organizations by ID and of users by organization and user ID, sent
+    with ``bulk_write(ordered=False)`` in batches of ``batch_size``, so
+    re-running or resuming a migration doesn't duplicate anything. The
+    number of bulk writes in flight is adjusted to the load of the database
+    like `CasClient` does for CAS. Check the documents against the database
+    with `check_schema` before writing.
+
+    Use as an async context manager::
+
+        async with CasDatabaseClient("mongodb://localhost:27017") as cas_client:
+            await add_users(cas_client, users_data)
+    """
+
+    def __init__(
+        self,
+        uri: str | None = Config.CAS_DATABASE_URI,
+        database: str = Config.CAS_DATABASE_NAME,
+        /,
+        batch_size: int = Config.CAS_DATABASE_BATCH_SIZE,
+        max_retries: int = Config.MAX_HTTP_RETRIES,
+        write_limiter: AdaptiveConcurrencyLimiter | None = None,
+    ):
+        if not uri:
+            raise ValueError("The CAS database URI is not set, see `FIFTYONE_DATABASE_URI`")
+
+        self.__uri = uri
+        self.__database_name = database
+        self.__batch_size = batch_size
+        self.__max_retries = max_retries
+        self.__write_limiter = write_limiter or AdaptiveConcurrencyLimiter(
+            Config.CAS_CONCURRENCY,
+            floor=Config.CAS_CONCURRENCY_MIN,
+            ceiling=Config.CAS_CONCURRENCY_MAX,
+        )
+
+        self.__client = None
+        self.__database = None
+
+    @property
+    def batch_size(self) -> int:
+        """Maximum number of users per bulk write."""
+        return self.__batch_size
+
+    @property
+    def write_limiter(self) -> AdaptiveConcurrencyLimiter:
+        return self.__write_limiter
+
+    async def __aenter__(self) -> "CasDatabaseClient":
+        # Only needed when writing to the database, not for the CAS API.
+        import motor.motor_asyncio  # pylint: disable=import-outside-toplevel
+
+        self.__client = motor.motor_asyncio.AsyncIOMotorClient(
+            self.__uri, maxPoolSize=Config.CAS_CONNECTION_LIMIT
+        )
+        self.__database = self.__client[self.__database_name]
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def close(self) -> None:
+        if self.__client is not None:
+            self.__client.close()
+            self.__client = self.__database = None
+
+    async def check_schema(self, /, allow_unverified: bool = False) -> list[str]:
+        """Compare the documents the client writes with a document of each
+        collection that is already in the database, e.g. written by CAS.
+
+        Args:
+            allow_unverified (bool): Whether a missing or empty collection,
+                which can't be checked, is only logged rather than a
+                difference, e.g. for a new CAS database.
+
+        Returns:
+            list[str]: The differences found, empty if none.
+        """
+        expected = {
+            ORGANIZATIONS_COLLECTION: org_document({"id": "", "name": "", "displayName": ""}),
+            USERS_COLLECTION: {
+                "_id": None,
+                **user_document("", {"id": "", "email": "", "role": ""}),
+            },
+        }
+
+        problems = []
+        for collection_name, document in expected.items():
+            existing = await self.__database[collection_name].find_one({})
+            if existing is None:
+                message = (
+                    f"No document in the '{collection_name}' collection of the "
+                    f"'{self.__database_name}' database to check the migrated documents against"
+                )
+                if allow_unverified:
+                    logger.warning(message)
+                else:
+                    problems.append(message)
+                continue
+
+            fields = set(document) | set(TIMESTAMP_FIELDS)
+            if missing := sorted(fields - set(existing)):
+                problems.append(
+                    f"{collection_name}: CAS documents have no {', '.join(missing)} field(s)"
+                )
+            if extra := sorted(set(existing) - fields):
+                problems.append(
+                    f"{collection_name}: CAS documents have {', '.join(extra)} field(s) "
+                    "that the migration doesn't write"
+                )
+            # Only organizations are written with their own IDs.
+            if document["_id"] is not None and not isinstance(existing["_id"], str):
+                problems.append(
+                    f"{collection_name}: CAS documents have {type(existing['_id']).__name__} "
+                    "IDs, not the string IDs of the migration"
+                )
+
+        return problems
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        /,
+        check: bool = True,
+        retries: int | None = None,
+        data: dict[str, Any] | None = None,
+        json: Any = None,
+        **_,
+    ) -> tuple[int, Any]:
+        """Answer a CAS API request of the migration from the database.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path relative to the CAS base URL.
+            check (bool): Whether to raise for an error status.
+            retries (int | None): Maximum number of retries of a write.
+                Defaults to ``max_retries`` of the client.
+            data (dict[str, Any] | None): The form payload.
+            json: The JSON payload.
+
+        Returns:
+            tuple[int, Any]: The status and body CAS would answer with.
+
+        Raises:
+            CasError: If ``check`` and the request failed, or it could not be
+                written after all retries.
+        """
+        import pymongo.errors  # pylint: disable=import-outside-toplevel
+
+        if retries is None:
+            retries = self.__max_retries
+
+        payload = json if json is not None else data
+        try:
+            if path == "/config/mode/" and method == "GET":
+                # The database is only used by CAS in internal mode.
+                await self.__database.command("ping")
+                status, body = 200, {"mode": "internal"}
+            elif _ORGS_PATH.match(path) and method == "POST":
+                await self.__bulk_write(
+                    ORGANIZATIONS_COLLECTION, ORGANIZATION_KEY, [org_document(payload)], retries
+                )
+                status, body = 201, payload
+            elif (match := _ORG_USERS_BATCH_PATH.match(path)) and method == "POST":
+                if not isinstance(payload, list):
+                    raise CasError(method, path, 400, "Expected a JSON array of users")
+                documents = [user_document(match["org_id"], user) for user in payload]
+                await self.__bulk_write(USERS_COLLECTION, USER_KEY, documents, retries)
+                status, body = 201, {"count": len(documents)}
+            elif (match := _ORG_USERS_PATH.match(path)) and method == "POST":
+                await self.__bulk_write(
+                    USERS_COLLECTION, USER_KEY, [user_document(match["org_id"], payload)], retries
+                )
+                status, body = 201, payload
+            elif (match := _ORG_USERS_PATH.match(path)) and method == "GET":
+                status, body = 200, await self.__list_users(match["org_id"])
+            else:
+                # E.g. the auth config, which is left to CAS.
+                status, body = 404, "Not served by the database client"
+        except pymongo.errors.PyMongoError as err:
+            raise CasError(method, path, None, repr(err)) from err
+
+        if check and status >= 400:
+            raise CasError(method, path, status, str(body)[:200])
+
+        return status, body
+
+    async def get(self, path: str, /, **kwargs) -> tuple[int, Any]:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, /, **kwargs) -> tuple[int, Any]:
+        return await self.request("POST", path, **kwargs)
+
+    async def __list_users(self, org_id):
+        cursor = self.__database[USERS_COLLECTION].find(
+            {"orgId": org_id}, {"userId": 1, "email": 1, "name": 1, "picture": 1, "role": 1}
+        )
+        return [
+            {
+                "id": document["userId"],
+                "email": document["email"],
+                "name": document.get("name"),
+                "picture": document.get("picture"),
+                "role": document["role"],
+            }
+            async for document in cursor
+        ]
+
+    async def __bulk_write(self, collection_name, key, documents, retries):
+        import pymongo  # pylint: disable=import-outside-toplevel
+
+        collection = self.__database[collection_name]
+        retry_exceptions = _retry_exceptions()
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        for i in range(0, len(documents), self.__batch_size):
+            # Upserts by key, so writing a document again only updates it.
+            requests = [
+                pymongo.UpdateOne(
+                    {field: document[field] for field in key},
+                    {
+                        "$set": {
+                            **{
+                                field: value
+                                for field, value in document.items()
+                                if field not in key
+                            },
+                            "updatedAt": now,
+                        },
+                        "$setOnInsert": {"createdAt": now},
+                    },
+                    upsert=True,
+                )
+                for document in documents[i : i + self.__batch_size]
+            ]
+
+            attempt = 0
+            while True:
+                await self.__write_limiter.acquire()
+                overloaded = False
+                start = time.perf_counter()
+                try:
+                    with metrics.timed("cas.bulk_write"):
+                        await collection.bulk_write(requests, ordered=False)
+                    break
+                except retry_exceptions:
+                    overloaded = True
+                    if attempt >= retries:
+                        raise
+                finally:
+                    self.__write_limiter.release(time.perf_counter() - start, overloaded)
+
+                attempt += 1
+                metrics.increment("cas.retries")
+                await asyncio.sleep(min(30.0, 0.5 * 2**attempt))
@@ -0,0 +1,131 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+Local stand-in for the Central Auth Service (CAS).
+
+Implements just enough of the CAS API used by the migration to exercise it
+offline, e.g. to check batch import vs. single user fallback behavior and
+throughput::
+
+    python -m cas_helpers.stub_server --port 8000 [--no-batch] [--latency 0.01] [--error-rate 0.01]
+
+and point ``CAS_BASE_URL`` at ``http://localhost:8000``.
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from aiohttp import web
+
+
+def create_app(
+    batch_import: bool = True, latency: float = 0.0, error_rate: float = 0.0
+) -> web.Application:
+    """Create the stand-in CAS application.
+
+    Args:
+        batch_import (bool): Whether to serve the batch user import endpoint.
+        latency (float): Seconds to wait before answering each request.
+        error_rate (float): Fraction of writes to fail with a 503.
+
+    Returns:
+        web.Application: The application. Written organizations and users are
+            kept in ``app["orgs"]`` and ``app["users"]`` and the number of
+            handled requests per route in ``app["requests"]``.
+    """
+
+    app = web.Application()
+    app["orgs"] = {}
+    app["users"] = {}
+    app["requests"] = {}
+
+    @web.middleware
+    async def count_requests(request, handler):
+        route = request.match_info.route.resource
+        name = route.canonical if route is not None else request.path
+        app["requests"][name] = app["requests"].get(name, 0) + 1
+        if latency:
+            await asyncio.sleep(latency)
+        if request.method == "POST" and random.random() < error_rate:
+            raise web.HTTPServiceUnavailable()
+        return await handler(request)
+
+    app.middlewares.append(count_requests)
+
+    async def get_mode(_):
+        return web.json_response({"mode": "internal"})
+
+    async def get_config(_):
+        return web.json_response({"authenticationProviders": []})
+
+    async def add_org(request):
+        data = await request.post()
+        if data["id"] in app["orgs"]:
+            raise web.HTTPConflict(text="Organization already exists")
+
+        app["orgs"][data["id"]] = dict(data)
+        return web.json_response(dict(data), status=201)
+
+    async def add_user(request):
+        data = await request.post()
+        app["users"][data["id"]] = {**data, "orgId": request.match_info["org_id"]}
+        return web.json_response(dict(data), status=201)
+
+    async def add_users(request):
+        users = await request.json()
+        if not isinstance(users, list):
+            raise web.HTTPBadRequest(text="Expected a JSON array of users")
+
+        for user in users:
+            app["users"][user["id"]] = {**user, "orgId": request.match_info["org_id"]}
+
+        return web.json_response({"count": len(users)}, status=201)
+
+    async def list_users(request):
+        org_id = request.match_info["org_id"]
+        return web.json_response(
+            [
+                {key: value for key, value in user.items() if key != "orgId"}
+                for user in app["users"].values()
+                if user["orgId"] == org_id
+            ]
+        )
+
+    app.router.add_get("/config/mode/", get_mode)
+    app.router.add_get("/config/", get_config)
+    app.router.add_post("/orgs/", add_org)
+    if batch_import:
+        app.router.add_post("/orgs/{org_id}/users/batch/", add_users)
+    app.router.add_post("/orgs/{org_id}/users/", add_user)
+    app.router.add_get("/orgs/{org_id}/users/", list_users)
+
+    async def print_summary(app):
+        print(f"Stored {len(app['orgs'])} organization(s), {len(app['users'])} user(s)")
+        print(json.dumps(app["requests"], indent=2))
+
+    app.on_shutdown.append(print_summary)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for CAS")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-batch", dest="batch_import", action="store_false",
+                        help="don't serve the batch import endpoint")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds to wait before answering each request")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of writes to fail with a 503")
+    args = parser.parse_args()
+
+    web.run_app(
+        create_app(
+            batch_import=args.batch_import, latency=args.latency, error_rate=args.error_rate
+        ),
+        host=args.host,
+        port=args.port,
+    )
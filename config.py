@@ -6,6 +6,8 @@
 
 import os
 
+from fiftyone_helpers.fiftyone_models import UserRole
+
 
 class Config:
     # Auth0 config
@@ -14,12 +16,86 @@ class Config:
     CLIENT_ID = os.environ["AUTH0_MGMT_CLIENT_ID"]
     CLIENT_MGMT_SECRET = os.environ["AUTH0_MGMT_CLIENT_SECRET"]
     CLIENT_SECRET = os.environ["AUTH0_CLIENT_SECRET"]
-    ORGANIZATION_ID = os.environ["AUTH0_ORGANIZATION"]
+    # Comma separated organizations to migrate concurrently, or a single one
+    ORGANIZATION_IDS = [
+        org_id.strip()
+        for org_id in (
+            os.environ.get("AUTH0_ORGANIZATIONS") or os.environ["AUTH0_ORGANIZATION"]
+        ).split(",")
+        if org_id.strip()
+    ]
+    ORGANIZATION_ID = ORGANIZATION_IDS[0]
+    # The organization made the default one in CAS, the first configured one
+    # unless set
+    DEFAULT_ORGANIZATION_ID = os.environ.get("MIGRATION_DEFAULT_ORGANIZATION") or ORGANIZATION_ID
 
     # script config
+    # Number of Auth0 member pages to read ahead, capped by the members held
+    AUTH0_PREFETCH_PAGES = int(os.environ.get("MIGRATION_AUTH0_PREFETCH_PAGES") or 2)
+    AUTH0_PREFETCH_MAX_MEMBERS = int(
+        os.environ.get("MIGRATION_AUTH0_PREFETCH_MAX_MEMBERS") or 1000
+    )
+    # Initial Auth0 Management API requests/sec, adjusted to the tenant's limit
+    AUTH0_RATE_LIMIT = float(os.environ.get("MIGRATION_AUTH0_RATE_LIMIT") or 10)
+    # Seconds to cache the Auth0 organization member IDs
+    AUTH0_MEMBERS_CACHE_TTL = float(os.environ.get("MIGRATION_AUTH0_MEMBERS_CACHE_TTL") or 300)
+    # Seconds to cache the Auth0 member and invitation counts
+    AUTH0_COUNTS_CACHE_TTL = float(os.environ.get("MIGRATION_AUTH0_COUNTS_CACHE_TTL") or 300)
+    # Auth0 members whose roles are updated at a time by the role sync
+    AUTH0_ROLE_SYNC_CONCURRENCY = int(os.environ.get("MIGRATION_AUTH0_ROLE_SYNC_CONCURRENCY") or 8)
+    # Seconds to cache Auth0 organizations, their settings and the role map,
+    # and the file to keep them in between runs, if any
+    AUTH0_METADATA_CACHE_TTL = float(os.environ.get("MIGRATION_AUTH0_METADATA_CACHE_TTL") or 3600)
+    AUTH0_METADATA_CACHE_PATH = os.environ.get("MIGRATION_AUTH0_METADATA_CACHE_PATH") or None
+    # Role of members without one, unless the organization's Auth0 metadata
+    # has a `default_user_role`
+    DEFAULT_USER_ROLE = os.environ.get("MIGRATION_DEFAULT_USER_ROLE") or "MEMBER"
+    if DEFAULT_USER_ROLE not in UserRole.__members__:
+        raise ValueError(
+            f"Invalid MIGRATION_DEFAULT_USER_ROLE '{DEFAULT_USER_ROLE}', expected one of "
+            f"{', '.join(UserRole.__members__)}"
+        )
+    # Seconds before first polling an Auth0 users export job, doubled up to a
+    # minute, and to wait for the job in total
+    AUTH0_EXPORT_POLL_INTERVAL = float(os.environ.get("MIGRATION_AUTH0_EXPORT_POLL_INTERVAL") or 1)
+    AUTH0_EXPORT_TIMEOUT = float(os.environ.get("MIGRATION_AUTH0_EXPORT_TIMEOUT") or 3600)
+    AUTH0_EXPORT_CONCURRENCY = int(os.environ.get("MIGRATION_AUTH0_EXPORT_CONCURRENCY") or 2)
+    # Users per sorted run spilled to disk when ordering users
+    SORT_RUN_SIZE = int(os.environ.get("MIGRATION_SORT_RUN_SIZE") or 10000)
     MAX_HTTP_RETRIES = int(os.environ.get("MAX_HTTP_RETRIES") or 10)
+    # Initial CAS writes in flight, adjusted to the load of CAS between the
+    # min and max
+    CAS_CONCURRENCY = int(os.environ.get("MIGRATION_CAS_CONCURRENCY") or 16)
+    CAS_CONCURRENCY_MIN = int(os.environ.get("MIGRATION_CAS_CONCURRENCY_MIN") or 1)
+    CAS_CONCURRENCY_MAX = int(
+        os.environ.get("MIGRATION_CAS_CONCURRENCY_MAX") or max(CAS_CONCURRENCY, 128)
+    )
+    # Seconds and retries of the single request listing an organization's
+    # users in CAS, to only write new or changed users
+    CAS_LIST_USERS_TIMEOUT = float(os.environ.get("MIGRATION_CAS_LIST_USERS_TIMEOUT") or 600)
+    CAS_LIST_USERS_RETRIES = int(os.environ.get("MIGRATION_CAS_LIST_USERS_RETRIES") or 2)
+    # Users per request when CAS supports batch import
+    CAS_BATCH_SIZE = int(os.environ.get("MIGRATION_CAS_BATCH_SIZE") or 100)
+    # Keep-alive connections to CAS, defaults to one per worker
+    CAS_CONNECTION_LIMIT = int(
+        os.environ.get("MIGRATION_CAS_CONNECTION_LIMIT") or CAS_CONCURRENCY_MAX
+    )
+    # Journal of migrated users used by `--resume`, fsynced every N records
+    JOURNAL_PATH = os.environ.get("MIGRATION_JOURNAL_PATH") or "migration-journal.jsonl"
+    JOURNAL_FLUSH_EVERY = int(os.environ.get("MIGRATION_JOURNAL_FLUSH_EVERY") or 64)
+    # Bound on batches waiting to be written to CAS; defaults to 2x the workers
+    CAS_QUEUE_SIZE = int(os.environ.get("MIGRATION_CAS_QUEUE_SIZE") or 2 * CAS_CONCURRENCY)
+    # Users per independently readable part of an exported snapshot
+    SNAPSHOT_PART_SIZE = int(os.environ.get("MIGRATION_SNAPSHOT_PART_SIZE") or 10000)
+    # Seconds between progress messages
+    PROGRESS_INTERVAL = float(os.environ.get("MIGRATION_PROGRESS_INTERVAL") or 10)
 
     # CAS config
     CAS_BASE_URL = os.environ["CAS_BASE_URL"]
     FIFTYONE_AUTH_SECRET = os.environ["FIFTYONE_AUTH_SECRET"]
+    # CAS internal mode database, only used with `--cas-database`
+    CAS_DATABASE_URI = os.environ.get("FIFTYONE_DATABASE_URI")
+    CAS_DATABASE_NAME = os.environ.get("CAS_DATABASE_NAME") or "cas"
+    # Users per bulk write to the CAS database
+    CAS_DATABASE_BATCH_SIZE = int(os.environ.get("MIGRATION_CAS_DATABASE_BATCH_SIZE") or 1000)
 
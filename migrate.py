@@ -4,13 +4,27 @@
 |
 """
 
+import argparse
 import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
 
-import aiohttp
 from auth0_helpers import Auth0ManagementAPIFactory, Auth0Manager
-from cas_helpers import (add_org, add_user, get_auth_mode,
-                         get_existing_auth_config)
+from cas_helpers import (CasClient, CasDatabaseClient, add_org, add_user, add_users,
+                         get_auth_mode, get_existing_auth_config, list_users,
+                         supports_batch_import)
 from config import Config
+from fiftyone_helpers import Organization, UserRole
+from migration_helpers import (FairQueue, MigrationJournal, ProgressReporter, SnapshotReader,
+                               SnapshotWriter, UserChange, UserDeltaIndex, configure_logging,
+                               metrics, shard_of)
+
+logger = logging.getLogger(__name__)
 
 auth0_mgmt_factory = Auth0ManagementAPIFactory(
     Config.CLIENT_DOMAIN,
@@ -19,56 +33,776 @@ auth0_mgmt_factory = Auth0ManagementAPIFactory(
     Config.AUDIENCE,
 )
 
-auth0_manager = Auth0Manager(
-    Config.ORGANIZATION_ID,
-    auth0_mgmt_factory,
-)
+# One manager per organization, all sharing the factory's token and the Auth0
+# rate limit.
+auth0_managers = {
+    organization_id: Auth0Manager(organization_id, auth0_mgmt_factory)
+    for organization_id in Config.ORGANIZATION_IDS
+}
+
+class UserMigration:
+    """Progress of the migration of the users of one organization"""
+
+    def __init__(self, organization_id, journal):
+        self.organization_id = organization_id
+        self.journal = journal
+        self.batch_import = False
+        self.migrated = 0
+        self.unchanged = 0
+        self.failures = []
+        self.error = None
+        self.elapsed = 0.0
+
+@contextlib.asynccontextmanager
+async def user_writers(cas_client):
+    """Run the pool of CAS writers shared by all organizations.
+
+    Yields:
+        FairQueue: The queue of ``(migration, batch)`` to write, keyed by
+            organization, which the writers take from round-robin.
+    """
+    # Bounded per organization so that reading from Auth0 can't get too far
+    # ahead of the CAS writers.
+    queue = FairQueue(maxsize=Config.CAS_QUEUE_SIZE)
+    # As many writers as CAS may ever take, the client's write limiter
+    # decides how many of them have a request in flight.
+    workers = [
+        asyncio.create_task(write_users(cas_client, queue))
+        for _ in range(Config.CAS_CONCURRENCY_MAX)
+    ]
+    try:
+        yield queue
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+async def write_users(cas_client, queue):
+    while True:
+        organization_id, (migration, batch) = await queue.get()
+        users = [user for _, user in batch]
+        try:
+            try:
+                if migration.batch_import:
+                    await add_users(cas_client, [dict(user) for user in users])
+                else:
+                    await add_user(cas_client, dict(users[0]))
+            except Exception as err:  # pylint: disable=broad-except
+                # Keep going, failures are reported once all users are done.
+                migration.failures.extend((user, err) for user in users)
+                metrics.increment("users.failed", len(users))
+                record = migration.journal.fail
+            else:
+                migration.migrated += len(users)
+                metrics.increment("users.migrated", len(users))
+                record = migration.journal.ack
+
+            user_ids_by_page = {}
+            for page, user in batch:
+                user_ids_by_page.setdefault(page, []).append(user.id)
+            for page, user_ids in user_ids_by_page.items():
+                record(page, user_ids)
+        except Exception as err:  # pylint: disable=broad-except
+            # The writers are shared by every organization, so an error of
+            # one organization's journal must not stop them.
+            logger.error(
+                "Unable to record users of '%s' in the journal: %r", organization_id, err
+            )
+        finally:
+            # Only once recorded, so that the journal is up to date when the
+            # organization's queue is joined.
+            queue.task_done(organization_id)
+
+async def migrate_users(
+    cas_client, queue, journal, iter_user_pages, organization_id, delta=True, shard=None
+):
+    """Write the users of an organization to CAS.
+
+    Args:
+        cas_client (CasClient | CasDatabaseClient): The CAS client.
+        queue (FairQueue): The queue of the CAS writers, see `user_writers`.
+        journal (MigrationJournal): The journal of the organization.
+        iter_user_pages: Called with the checkpoint to start from to iterate
+            over ``(next_param, users)`` pages, e.g.
+            `Auth0Manager.iter_user_pages`.
+        organization_id (str): The ID of the organization of the users.
+        delta (bool): Whether to only write new or changed users.
+        shard (tuple[int, int] | None): ``(index, count)`` if only the users
+            of one shard are migrated.
+
+    Returns:
+        UserMigration: The outcome of the migration.
+    """
+    logger.info(f"Migrating Users of '{organization_id}'...")
+    migration = UserMigration(organization_id, journal)
+
+    if journal.done:
+        logger.info(f"All users were already migrated according to '{journal.path}'")
+        return migration
+
+    # Load the users already in CAS once so that only new or changed users
+    # are written.
+    delta_index = None
+    if delta:
+        if (cas_users := await list_users(cas_client, organization_id)) is not None:
+            if shard is not None:
+                index, count = shard
+                cas_users = [user for user in cas_users if shard_of(user["id"], count) == index]
+            delta_index = UserDeltaIndex(cas_users)
+            logger.info(f"Found {len(delta_index)} existing user(s) of '{organization_id}' in CAS")
+        else:
+            logger.warning("Unable to list existing users in CAS, writing all users")
+
+    # Decide once whether CAS can take users in batches or if they have to be
+    # added one at a time.
+    migration.batch_import = await supports_batch_import(cas_client, organization_id)
+    if not migration.batch_import:
+        batch_size = 1
+        logger.info("CAS does not support batch import, adding users one at a time")
+    elif isinstance(cas_client, CasDatabaseClient):
+        # One bulk write per batch.
+        batch_size = cas_client.batch_size
+    else:
+        batch_size = Config.CAS_BATCH_SIZE
+
+    batch = []
+    try:
+        async for next_param, users in iter_user_pages(journal.cursor):
+            # Skip users that were already written by a previous run or that
+            # are the same in CAS, counting them as they go so that progress
+            # includes them.
+            page_size = len(users)
+            users = [user for user in users if user.id not in journal.acked]
+            metrics.increment("users.skipped", page_size - len(users))
+            if delta_index is not None:
+                page_size = len(users)
+                users = [
+                    user for user in users if delta_index.classify(user) != UserChange.UNCHANGED
+                ]
+                metrics.increment("users.unchanged", page_size - len(users))
+            page = journal.begin_page(next_param, [user.id for user in users])
+
+            for user in users:
+                batch.append((page, user))
+                if len(batch) == batch_size:
+                    await queue.put(organization_id, (migration, batch))
+                    batch = []
+        if batch:
+            await queue.put(organization_id, (migration, batch))
+    except BaseException:
+        # Don't write the rest of the users of a failed organization, they
+        # weren't recorded so a resumed run reads them again.
+        if dropped := queue.discard(organization_id):
+            logger.debug(f"Dropped {dropped} batch(es) of users of '{organization_id}'")
+        raise
+    finally:
+        # The writes in flight record to the journal, which the caller closes
+        # once this returns.
+        await queue.join(organization_id)
+
+    if delta_index is not None:
+        migration.unchanged = delta_index.counts[UserChange.UNCHANGED]
+        logger.info(
+            f"Users of '{organization_id}' created: {delta_index.counts[UserChange.CREATED]}, "
+            f"updated: {delta_index.counts[UserChange.UPDATED]}, "
+            f"unchanged: {migration.unchanged}"
+        )
+
+    if migration.failures:
+        logger.warning(
+            f"Failed to migrate {len(migration.failures)} user(s) of '{organization_id}':\n"
+            + "\n".join(f"  {user.email} ({user.id}): {err}" for user, err in migration.failures)
+        )
+
+    return migration
+
+async def migrate_organizations(args, cas_client):
+    """Migrate every configured organization and its users concurrently.
+
+    The organizations share the Auth0 token and rate limit and the pool of
+    CAS writers, which serves the organizations in turn.
+    """
+    shard_context = {}
+    if args.shard_context:
+        with open(args.shard_context, encoding="utf-8") as f:
+            shard_context = json.load(f)
+
+    async def count_users(organization_id, progress):
+        # Only for the ETA, so the migration doesn't wait for it.
+        try:
+            count = await auth0_managers[organization_id].count_users()
+        except Exception as err:  # pylint: disable=broad-except
+            logger.debug(f"Unable to count the users of '{organization_id}': {err!r}")
+            return
+        if count is not None:
+            progress.add_total(round(count / args.shard[1]) if args.shard else count)
+
+    async def migrate_one(organization_id, queue, progress):
+        manager = auth0_managers[organization_id]
+        migration = None
+        counting = None
+        started_at = time.perf_counter()
+        try:
+            resume = args.resume
+            if (context := shard_context.get(organization_id)) is not None:
+                # The coordinator already created the organization in CAS and
+                # read the users of this shard from Auth0.
+                manager.preload(
+                    Organization(**context["organization"]),
+                    {UserRole(role): role_id for role, role_id in context["role_map"].items()},
+                    {"default_user_role": UserRole(context["default_user_role"])},
+                )
+                snapshot = SnapshotReader(context["snapshots"][args.shard[0]])
+                progress.add_total(snapshot.user_count)
+                iter_user_pages = _iter_snapshot_pages(snapshot)
+                # The journal's checkpoints are offsets in the snapshots of a
+                # previous run.
+                resume = resume and context["resume"]
+            else:
+                counting = asyncio.create_task(count_users(organization_id, progress))
+                await migrate_organization(cas_client, await manager.get_organization())
+
+                def iter_user_pages(from_param):
+                    return _iter_auth0_user_pages(
+                        args, manager, from_param=from_param, shard=args.shard
+                    )
+
+            journal = MigrationJournal(
+                _journal_path(organization_id, args.shard),
+                organization_id,
+                flush_every=Config.JOURNAL_FLUSH_EVERY,
+            )
+            with journal.open(resume=resume):
+                migration = await migrate_users(
+                    cas_client,
+                    queue,
+                    journal,
+                    iter_user_pages,
+                    organization_id,
+                    delta=not args.full,
+                    shard=args.shard,
+                )
+        except Exception as err:  # pylint: disable=broad-except
+            # Let the other organizations finish, the error is in the summary.
+            logger.error(f"Failed to migrate organization '{organization_id}': {err!r}")
+            migration = migration or UserMigration(organization_id, None)
+            migration.error = err
+        finally:
+            if counting is not None:
+                counting.cancel()
+
+        migration.elapsed = time.perf_counter() - started_at
+        return migration
+
+    async with user_writers(cas_client) as queue, _progress(cas_client) as progress:
+        migrations = await asyncio.gather(
+            *(
+                migrate_one(organization_id, queue, progress)
+                for organization_id in Config.ORGANIZATION_IDS
+            )
+        )
+
+    if len(migrations) > 1:
+        lines = []
+        for migration in migrations:
+            status = f"error: {migration.error!r}" if migration.error else "ok"
+            lines.append(
+                f"  {migration.organization_id}: {migration.migrated} migrated, "
+                f"{migration.unchanged} unchanged, {len(migration.failures)} failed "
+                f"in {migration.elapsed:.1f}s ({status})"
+            )
+        logger.info("Summary:\n" + "\n".join(lines))
+
+    return migrations
+
+async def run_shards(args, cas_client):
+    """Migrate in ``args.shards`` processes, each writing the users of one
+    shard, and merge their reports into the metrics of this run.
+
+    The organizations are created in CAS and their role maps and settings
+    resolved once, here. Their users are read from Auth0 once, here too, and
+    written to a snapshot per shard, so that the shards only write to CAS.
+    Everything is handed to the shards in a context file.
+    """
+    context = {}
+    try:
+        for organization_id, manager in auth0_managers.items():
+            org = await manager.get_organization()
+            await migrate_organization(cas_client, org)
+            role_map = await manager.get_role_map()
+            settings = await manager.get_settings()
+            context[organization_id] = {
+                "organization": dict(org),
+                "role_map": {role.value: role_id for role, role_id in role_map.items()},
+                "default_user_role": settings["default_user_role"].value,
+                "snapshots": [
+                    _shard_snapshot_path(organization_id, (index, args.shards))
+                    for index in range(args.shards)
+                ],
+            }
+
+        async def split_one(organization_id):
+            org_context = context[organization_id]
+            org_context["resume"] = not await split_users(
+                args,
+                auth0_managers[organization_id],
+                Organization(**org_context["organization"]),
+                org_context["snapshots"],
+            )
+
+        await asyncio.gather(*(split_one(organization_id) for organization_id in context))
+    finally:
+        await auth0_mgmt_factory.close()
+
+    async def run_shard(index):
+        command = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--shard",
+            f"{index}/{args.shards}",
+            "--shard-context",
+            context_path,
+            "--report",
+            os.path.join(tmp_dir, f"report-{index}.json"),
+        ]
+        if args.resume:
+            command.append("--resume")
+        if args.full:
+            command.append("--full")
+        if args.cas_database:
+            command.append("--cas-database")
+        if args.verbose:
+            command.append(f"-{'v' * args.verbose}")
+        if args.quiet:
+            command.append("--quiet")
+        command.extend(["--log-format", args.log_format])
+
+        # The shards write their logs, tagged with the shard, straight to the
+        # output of this process.
+        process = await asyncio.create_subprocess_exec(*command)
+        return await process.wait()
 
-async def migrate_users(session):
-    print("Migrating Users...")
-    async for user in auth0_manager.iter_users():
-        await add_user(session, dict(user))
+    logger.info(f"Migrating Users in {args.shards} shards...")
+    with tempfile.TemporaryDirectory(prefix="migration-shards-") as tmp_dir:
+        context_path = os.path.join(tmp_dir, "context.json")
+        with open(context_path, "w", encoding="utf-8") as f:
+            json.dump(context, f)
 
-async def migrate_organization(session):
-    print("Migrating Organizations...")
-    org = await auth0_manager.get_organization()
-    await add_org(session, dict(org))
+        statuses = await asyncio.gather(*(run_shard(index) for index in range(args.shards)))
 
-async def main():
-    async with aiohttp.ClientSession() as session:
-        mode = await get_auth_mode(session)
+        # Merged into the report of this run, and removed with the context.
+        for index in range(args.shards):
+            try:
+                with open(os.path.join(tmp_dir, f"report-{index}.json"), encoding="utf-8") as f:
+                    metrics.merge(json.load(f))
+            except FileNotFoundError:
+                pass
+
+    if failed := [index for index, status in enumerate(statuses) if status != 0]:
+        logger.warning(
+            f"Shard(s) {', '.join(map(str, failed))} failed, run them again with --resume"
+        )
+        return
+
+    # Kept until every shard is done, for --resume.
+    for org_context in context.values():
+        for path in org_context["snapshots"]:
+            os.remove(path)
+            os.remove(f"{path}.index.json")
+
+async def split_users(args, manager, org, paths):
+    """Read the users of an organization from Auth0 once and write each to
+    the snapshot of its shard.
+
+    The snapshots of a previous run are used instead if resuming.
+
+    Returns:
+        bool: Whether the snapshots were written, rather than reused.
+    """
+    if args.resume and all(os.path.exists(f"{path}.index.json") for path in paths):
+        logger.info(f"Using the Users of '{org.id}' read from Auth0 by a previous run")
+        return False
+
+    logger.info(f"Reading Users of '{org.id}' from Auth0 for {len(paths)} shards...")
+    # Only the organization is needed to import a snapshot.
+    snapshots = [
+        SnapshotWriter(path, part_size=Config.SNAPSHOT_PART_SIZE) for path in paths
+    ]
+    with contextlib.ExitStack() as stack:
+        for snapshot in snapshots:
+            stack.enter_context(snapshot.open(org, {}))
+
+        async for _, users in _iter_auth0_user_pages(args, manager):
+            users_by_shard = [[] for _ in snapshots]
+            for user in users:
+                users_by_shard[shard_of(user.id, len(snapshots))].append(user)
+            for snapshot, shard_users in zip(snapshots, users_by_shard):
+                snapshot.write_users(shard_users)
+            metrics.increment("users.read", len(users))
+
+    logger.info(f"Read {sum(snapshot.user_count for snapshot in snapshots)} User(s) of '{org.id}'")
+    return True
+
+def _journal_path(organization_id, shard=None):
+    root, ext = os.path.splitext(Config.JOURNAL_PATH)
+    if len(Config.ORGANIZATION_IDS) > 1:
+        root = f"{root}-{organization_id}"
+    if shard is not None:
+        root = f"{root}-shard{shard[0]}of{shard[1]}"
+    return f"{root}{ext}"
+
+def _shard_snapshot_path(organization_id, shard):
+    root, _ = os.path.splitext(_journal_path(organization_id, shard))
+    return f"{root}.ndjson.gz"
+
+def _iter_snapshot_pages(snapshot, /, start=0, end=None):
+    """Get a function iterating over the ``(next_param, users)`` pages of a
+    snapshot, or of a byte range of it, from a checkpoint. The checkpoints
+    are the byte offsets of the snapshot parts."""
+    range_end = snapshot.size if end is None else end
+
+    async def iter_user_pages(from_param):
+        range_start = start if from_param is None else int(from_param)
+        for _, next_offset, users in snapshot.iter_user_parts(range_start, range_end):
+            yield (str(next_offset) if next_offset < range_end else None), users
+
+    return iter_user_pages
+
+def _iter_auth0_user_pages(args, manager, /, **kwargs):
+    if args.source == "export":
+        return manager.iter_exported_user_pages(**kwargs)
+    return manager.iter_user_pages(**kwargs)
+
+def _progress(cas_client):
+    return ProgressReporter(
+        interval=Config.PROGRESS_INTERVAL,
+        details=lambda: f"CAS concurrency {cas_client.write_limiter.limit}",
+    )
+
+async def migrate_organization(cas_client, org):
+    logger.info(f"Migrating Organization '{org.id}'...")
+    await add_org(cas_client, dict(org))
+
+async def export_snapshot(args):
+    """Write the organization, its roles and its users to a snapshot file,
+    to be imported later without going through Auth0."""
+    logger.info(f"Exporting Organization '{args.organization}' and Users to '{args.snapshot}'...")
+    manager = auth0_managers.get(args.organization)
+    if manager is None:
+        manager = Auth0Manager(args.organization, auth0_mgmt_factory)
+        # Only the managers of the configured organizations are refreshed by
+        # `main`.
+        if args.refresh_auth0_metadata:
+            manager.invalidate_metadata()
+    try:
+        org = await manager.get_organization()
+        # Only read from Auth0, the roles are created by the migration.
+        role_map = await manager.find_role_map()
+
+        snapshot = SnapshotWriter(args.snapshot, part_size=Config.SNAPSHOT_PART_SIZE)
+        with snapshot.open(org, role_map):
+            async for _, users in _iter_auth0_user_pages(args, manager):
+                snapshot.write_users(users)
+                metrics.increment("users.exported", len(users))
+    finally:
+        await auth0_mgmt_factory.close()
+
+    logger.info(f"Exported {snapshot.user_count} user(s)")
+
+async def sync_roles(args):
+    """Give the default role in Auth0 to the members of the organizations
+    that don't have a role."""
+    logger.info("Syncing Auth0 Member Roles...")
+    default_role = UserRole(args.default_role) if args.default_role else None
+    try:
+        results = await asyncio.gather(
+            *(
+                manager.sync_user_roles(default_role=default_role)
+                for manager in auth0_managers.values()
+            ),
+            return_exceptions=True,
+        )
+    finally:
+        await auth0_mgmt_factory.close()
+
+    for organization_id, counts in zip(auth0_managers, results):
+        if isinstance(counts, Exception):
+            logger.error(f"  {organization_id}: error: {counts!r}")
+        else:
+            logger.info(
+                f"  {organization_id}: {counts['updated']} updated, "
+                f"{counts['unchanged']} unchanged, {counts['failed']} failed"
+            )
+
+async def import_snapshot(args, cas_client):
+    """Write the organization and users of a snapshot, or of one split of
+    it, to CAS."""
+    snapshot = SnapshotReader(args.snapshot)
+    org = snapshot.organization
+
+    start, end = 0, None
+    total = snapshot.user_count
+    journal_path = args.journal or f"{args.snapshot}.journal.jsonl"
+    if args.split:
+        index, count = args.split
+        start, end = snapshot.split(count)[index]
+        total = snapshot.count_users(start, end)
+        journal_path = args.journal or f"{args.snapshot}.journal-{index}-of-{count}.jsonl"
+        logger.info(f"Importing split {index + 1} of {count}, bytes {start} to {end}")
+
+    await migrate_organization(cas_client, org)
+    journal = MigrationJournal(journal_path, org.id, flush_every=Config.JOURNAL_FLUSH_EVERY)
+    with journal.open(resume=args.resume):
+        async with user_writers(cas_client) as queue, _progress(cas_client) as progress:
+            progress.add_total(total)
+            await migrate_users(
+                cas_client,
+                queue,
+                journal,
+                _iter_snapshot_pages(snapshot, start, end),
+                org.id,
+                delta=not args.full,
+            )
+
+async def main(args):
+    if args.refresh_auth0_metadata:
+        for manager in auth0_managers.values():
+            manager.invalidate_metadata()
+
+    try:
+        if args.command == "export":
+            await export_snapshot(args)
+        elif args.command == "sync-roles":
+            await sync_roles(args)
+        else:
+            cas_client = CasDatabaseClient() if args.cas_database else CasClient()
+            async with cas_client:
+                await migrate(args, cas_client)
+    finally:
+        metrics.write_report(args.report)
+        logger.info(f"Run report written to '{args.report}'")
+        if args.prometheus_textfile:
+            metrics.write_prometheus(args.prometheus_textfile)
+
+async def migrate(args, cas_client):
+    mode = await get_auth_mode(cas_client)
 
     # test connection to CAS
     if not mode:
-        print("==== Error ====")
-        print("Unable to connect to the Central Auth Service (CAS)\n")
-        print("Please check your Fiftyone Teams deployment and ensure that")
-        print("there is a running CAS at the supplied CAS_BASE_URL\n")
+        logger.error(
+            "Unable to connect to the Central Auth Service (CAS)\n\n"
+            "Please check your Fiftyone Teams deployment and ensure that\n"
+            "there is a running CAS at the supplied CAS_BASE_URL"
+        )
 
     # we don't want to run in legacy mode
     if mode == "legacy":
-        print("==== Alert ====")
-        print("The migration script must be run using a Central Auth")
-        print("Service (CAS) configured to internal mode.\n")
-        print("The currently running CAS is configured to legacy mode\n")
-        print("Please check the FIFTYONE_AUTH_MODE environment variable")
-        print("in your running Fiftyone Teams Deployment\n")
-        print("For help, contact your Voxel51 Customer Service Representative\n")
+        logger.error(
+            "The migration script must be run using a Central Auth\n"
+            "Service (CAS) configured to internal mode.\n\n"
+            "The currently running CAS is configured to legacy mode\n\n"
+            "Please check the FIFTYONE_AUTH_MODE environment variable\n"
+            "in your running Fiftyone Teams Deployment\n\n"
+            "For help, contact your Voxel51 Customer Service Representative"
+        )
 
     # it's internal, green light go!
     if mode == "internal":
-        async with aiohttp.ClientSession() as session:
-            auth_config = await get_existing_auth_config(session)
-            await migrate_organization(session)
-            await migrate_users(session)
-            if not auth_config:
-                print("==== Warning ====")
-                print("An existing auth configuration was not found")
-                print("or does not match an existing IdP configuration.\n")
-                print("Please review your auth configuration in the provided")
-                print("page at: {your domain}/cas/admins")
+        try:
+            # The shards of `--shards` were checked by their coordinator.
+            if args.cas_database and not args.shard_context:
+                problems = await cas_client.check_schema(
+                    allow_unverified=args.allow_unverified_schema
+                )
+                if problems:
+                    logger.error(
+                        "The documents in the CAS database don't match the ones the migration "
+                        "writes:\n"
+                        + "\n".join(f"  {problem}" for problem in problems)
+                        + "\n\nMigrate through the CAS API instead, without --cas-database, or "
+                        "pass --allow-unverified-schema if the collections are only empty"
+                    )
+                    raise SystemExit(1)
+
+                # Only served by the CAS API.
+                auth_config = None
+            else:
+                auth_config = await get_existing_auth_config(cas_client)
+
+            if args.command == "import":
+                await import_snapshot(args, cas_client)
+            elif args.shards:
+                await run_shards(args, cas_client)
+            else:
+                await migrate_organizations(args, cas_client)
+            if args.cas_database:
+                logger.warning(
+                    "The auth configuration is not checked when writing to the CAS database.\n\n"
+                    "Please review your auth configuration in the provided\n"
+                    "page at: {your domain}/cas/admins"
+                )
+            elif not auth_config:
+                logger.warning(
+                    "An existing auth configuration was not found\n"
+                    "or does not match an existing IdP configuration.\n\n"
+                    "Please review your auth configuration in the provided\n"
+                    "page at: {your domain}/cas/admins"
+                )
+        finally:
+            await auth0_mgmt_factory.close()
+
+        logger.info("Migration Complete")
+
+def _parse_part(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid value '{value}', expected I/N") from None
+
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"invalid value '{value}', expected 0 <= I < N")
+
+    return index, count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Migrate Auth0 organizations and their users to the Central Auth Service"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue a previous run from its journal, skipping users that were already "
+        "migrated. Goes before the command, e.g. `--resume import`",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="write every user to CAS, even if it is unchanged. Goes before the command, "
+        "e.g. `--full import`",
+    )
+    parser.add_argument(
+        "--source",
+        choices=["members", "export"],
+        default="members",
+        help="read users from Auth0 organization member pages, or from Auth0 bulk user export "
+        "jobs of the organization's connections, faster for very large organizations. With "
+        "--resume, the export of the connection a run stopped in is run again in full",
+    )
+    parser.add_argument(
+        "--refresh-auth0-metadata",
+        action="store_true",
+        help="fetch the organizations, their settings and the roles from Auth0 again, "
+        "instead of using the ones cached by a previous run",
+    )
+    parser.add_argument(
+        "--cas-database",
+        action="store_true",
+        help="write organizations and users straight to the CAS database at "
+        "FIFTYONE_DATABASE_URI with bulk upserts, instead of through the CAS API",
+    )
+    parser.add_argument(
+        "--allow-unverified-schema",
+        action="store_true",
+        help="with --cas-database, write to collections of the CAS database that are missing "
+        "or empty, so that the documents can't be checked against the ones CAS writes",
+    )
+    shard_group = parser.add_mutually_exclusive_group()
+    shard_group.add_argument(
+        "--shards",
+        type=int,
+        help="migrate in this many local processes: the users are read from Auth0 once, then "
+        "each process writes a disjoint subset of them to CAS",
+    )
+    shard_group.add_argument(
+        "--shard",
+        type=_parse_part,
+        metavar="I/N",
+        help="only migrate the users of the I-th (from 0) of N shards, e.g. on one of N hosts. "
+        "Each shard reads every user from Auth0",
+    )
+    parser.add_argument(
+        "--shard-context",
+        help="organizations, role maps and users prepared by the coordinator of `--shards`",
+    )
+    parser.add_argument(
+        "--report",
+        default="migration-report.json",
+        help="path of the JSON run report with per-stage latencies, counts and throughput",
+    )
+    parser.add_argument(
+        "--prometheus-textfile",
+        help="also write the run metrics to this file in the Prometheus text format",
+    )
+    verbosity_group = parser.add_mutually_exclusive_group()
+    verbosity_group.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="also log debug messages, e.g. every CAS write",
+    )
+    verbosity_group.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="only log warnings and errors",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        default="text",
+        help="write logs as text or as JSON lines, e.g. for a log aggregator",
+    )
 
-        print("Migration Complete")
+    # Without a command, users are migrated straight from Auth0 to CAS.
+    subparsers = parser.add_subparsers(dest="command")
+    export_parser = subparsers.add_parser(
+        "export", help="write the Auth0 organization and its users to a snapshot file"
+    )
+    export_parser.add_argument("snapshot", help="path of the gzipped NDJSON snapshot")
+    export_parser.add_argument(
+        "--organization",
+        default=Config.ORGANIZATION_ID,
+        help="ID of the Auth0 organization to export, defaults to the first configured one",
+    )
+    sync_roles_parser = subparsers.add_parser(
+        "sync-roles", help="give the default role in Auth0 to members without a role"
+    )
+    sync_roles_parser.add_argument(
+        "--default-role",
+        choices=[role.value for role in UserRole],
+        help="role to give, defaults to the default user role of each organization",
+    )
+    import_parser = subparsers.add_parser(
+        "import", help="migrate the organization and users of a snapshot file to CAS"
+    )
+    import_parser.add_argument("snapshot", help="path of a snapshot written by `export`")
+    import_parser.add_argument(
+        "--split",
+        type=_parse_part,
+        metavar="I/N",
+        help="only import the I-th (from 0) of N byte ranges of the snapshot, "
+        "to import in N parallel processes",
+    )
+    import_parser.add_argument(
+        "--journal",
+        help="path of the journal, defaults to one next to the snapshot for each split",
+    )
 
+    args = parser.parse_args()
+    # Checked before anything is written to CAS.
+    if args.shards is not None and args.shards < 1:
+        parser.error(f"argument --shards: invalid value {args.shards}, expected at least 1")
+    if args.shard_context and not args.shard:
+        parser.error("argument --shard-context: only used with --shard")
 
-asyncio.run(main())
+    log_listener = configure_logging(
+        -1 if args.quiet else args.verbose,
+        json_format=args.log_format == "json",
+        fields={"shard": f"{args.shard[0]}/{args.shard[1]}"} if args.shard else None,
+    )
+    try:
+        asyncio.run(main(args))
+    finally:
+        log_listener.stop()
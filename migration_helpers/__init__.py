@@ -0,0 +1,15 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+from migration_helpers.delta import UserChange, UserDeltaIndex, user_digest
+from migration_helpers.fair_queue import FairQueue
+from migration_helpers.gzip_ndjson import GzipNdjsonDecoder
+from migration_helpers.journal import MigrationJournal
+from migration_helpers.logs import JsonFormatter, configure_logging
+from migration_helpers.metrics import Histogram, Metrics, metrics
+from migration_helpers.progress import ProgressReporter
+from migration_helpers.sharding import shard_of
+from migration_helpers.snapshot import SnapshotReader, SnapshotWriter
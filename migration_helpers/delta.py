@@ -0,0 +1,59 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import enum
+import hashlib
+from typing import Any, Iterable
+
+from fiftyone_helpers import User
+
+
+class UserChange(str, enum.Enum):
+    """How a user differs from the one already in CAS"""
+
+    CREATED = "created"
+    UPDATED = "updated"
+    UNCHANGED = "unchanged"
+
+
+def user_digest(user_data: dict[str, Any]) -> bytes:
+    """Digest of the user fields that are written to CAS."""
+    role = user_data["role"]
+    fields = (
+        user_data["email"],
+        user_data.get("name"),
+        user_data.get("picture"),
+        role.value if isinstance(role, enum.Enum) else role,
+    )
+    return hashlib.blake2b(
+        "\0".join(field or "" for field in fields).encode(), digest_size=16
+    ).digest()
+
+
+class UserDeltaIndex:
+    """Index of the users already in CAS, to only write new or changed users.
+
+    Only the user ID and a digest of its fields are kept for each user.
+    """
+
+    def __init__(self, cas_users: Iterable[dict[str, Any]]):
+        self.__digests = {cas_user["id"]: user_digest(cas_user) for cas_user in cas_users}
+        self.counts = {change: 0 for change in UserChange}
+
+    def __len__(self):
+        return len(self.__digests)
+
+    def classify(self, user: User) -> UserChange:
+        """Determine and count how the user differs from the one in CAS."""
+        digest = self.__digests.get(user.id)
+        if digest is None:
+            change = UserChange.CREATED
+        elif digest != user_digest(dict(user)):
+            change = UserChange.UPDATED
+        else:
+            change = UserChange.UNCHANGED
+
+        self.counts[change] += 1
+        return change
@@ -0,0 +1,110 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import asyncio
+import collections
+from typing import Any, Hashable
+
+
+class FairQueue:
+    """Queue shared by several producers, e.g. one per organization, that
+    hands out items round-robin across producers.
+
+    Each producer has its own bounded queue, so a producer with many items
+    can neither fill the queue for the others nor be served ahead of them:
+    consumers take the next item of each producer with items waiting in
+    turn.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self.__maxsize = maxsize
+
+        self.__items: dict[Hashable, collections.deque] = {}
+        # Producers with items waiting, in the order they are served. A
+        # producer is in here at most once.
+        self.__ready: collections.deque = collections.deque()
+        self.__available = asyncio.Semaphore(0)
+        self.__space: dict[Hashable, asyncio.Semaphore] = {}
+        self.__unfinished: dict[Hashable, int] = {}
+        self.__finished: dict[Hashable, asyncio.Event] = {}
+
+    async def put(self, key: Hashable, item: Any) -> None:
+        """Add an item of the ``key`` producer, waiting while the producer
+        has ``maxsize`` items waiting."""
+        if key not in self.__items:
+            self.__items[key] = collections.deque()
+            self.__space[key] = asyncio.Semaphore(self.__maxsize)
+            self.__unfinished[key] = 0
+            self.__finished[key] = asyncio.Event()
+
+        if self.__maxsize:
+            await self.__space[key].acquire()
+
+        items = self.__items[key]
+        if not items:
+            self.__ready.append(key)
+        items.append(item)
+
+        self.__unfinished[key] += 1
+        self.__finished[key].clear()
+        self.__available.release()
+
+    async def get(self) -> tuple[Hashable, Any]:
+        """Take the next item, from the next producer in turn.
+
+        Returns:
+            tuple[Hashable, Any]: The key of the producer and the item.
+        """
+        while True:
+            await self.__available.acquire()
+            if self.__ready:
+                break
+            # The permit of a discarded item.
+
+        key = self.__ready.popleft()
+        items = self.__items[key]
+        item = items.popleft()
+        if items:
+            self.__ready.append(key)
+
+        if self.__maxsize:
+            self.__space[key].release()
+
+        return key, item
+
+    def discard(self, key: Hashable) -> int:
+        """Drop the items of the ``key`` producer that are still waiting, as
+        if they had been processed. Items already taken are left to finish.
+
+        Returns:
+            int: The number of dropped items.
+        """
+        items = self.__items.get(key)
+        if not items:
+            return 0
+
+        count = len(items)
+        items.clear()
+        self.__ready.remove(key)
+        if self.__maxsize:
+            for _ in range(count):
+                self.__space[key].release()
+
+        self.__unfinished[key] -= count
+        if not self.__unfinished[key]:
+            self.__finished[key].set()
+
+        return count
+
+    def task_done(self, key: Hashable) -> None:
+        """Mark an item of the ``key`` producer as processed."""
+        self.__unfinished[key] -= 1
+        if not self.__unfinished[key]:
+            self.__finished[key].set()
+
+    async def join(self, key: Hashable) -> None:
+        """Wait until every item of the ``key`` producer has been processed."""
+        if key in self.__finished:
+            await self.__finished[key].wait()
@@ -0,0 +1,52 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import json
+import zlib
+from typing import Any
+
+# Gzip wrapping for zlib
+GZIP_WBITS = 31
+# Bytes of compressed data to read at a time
+READ_SIZE = 1 << 16
+
+
+class GzipNdjsonDecoder:
+    """Decode gzip compressed NDJSON fed a chunk at a time, e.g. Auth0 user
+    exports and snapshots.
+
+    Only the current chunk and a partial line are held in memory. The data
+    may be several gzip members in a row, as a gzip file may be.
+    """
+
+    def __init__(self):
+        self.__decompressor = zlib.decompressobj(GZIP_WBITS)
+        self.__pending = b""
+
+    def decode(self, chunk: bytes) -> list[dict[str, Any]]:
+        """Decompress a chunk and parse the lines it completes.
+
+        Returns:
+            list[dict[str, Any]]: The records of the completed lines.
+        """
+        data = b""
+        while chunk:
+            data += self.__decompressor.decompress(chunk)
+            chunk = self.__decompressor.unused_data
+            if self.__decompressor.eof:
+                self.__decompressor = zlib.decompressobj(GZIP_WBITS)
+
+        *lines, self.__pending = (self.__pending + data).split(b"\n")
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def flush(self) -> list[dict[str, Any]]:
+        """Parse the last line, once all the data was decoded.
+
+        Returns:
+            list[dict[str, Any]]: The record of the last line, if it isn't
+                terminated by a newline.
+        """
+        pending, self.__pending = self.__pending + self.__decompressor.flush(), b""
+        return [json.loads(pending)] if pending.strip() else []
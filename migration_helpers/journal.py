@@ -0,0 +1,172 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import json
+import os
+
+
+class MigrationJournal:
+    """Append-only JSONL journal of migration progress, used to resume a run.
+
+    The journal records the IDs of users acknowledged by CAS and the Auth0
+    checkpoint (``from_param``) up to which every page of members has been
+    fully acknowledged. Pages are written to CAS out of order, so the
+    checkpoint only advances once every earlier page is done as well.
+
+    Records are buffered and written and fsynced in groups of
+    ``flush_every`` records.
+    """
+
+    def __init__(self, path: str, organization_id: str, /, flush_every: int = 64):
+        self.__path = path
+        self.__organization_id = organization_id
+        self.__flush_every = flush_every
+
+        self.__file = None
+        self.__buffer: list[str] = []
+
+        # Resumable state
+        self.acked: set[str] = set()
+        self.cursor: str | None = None
+        self.done = False
+
+        # In flight pages, in Auth0 order. Each is [next_param, pending_ids, failed]
+        self.__pages: dict[int, list] = {}
+        self.__next_page = 0
+        self.__head_page = 0
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    def open(self, resume: bool = False) -> "MigrationJournal":
+        """Open the journal, loading the previous state if resuming.
+
+        Args:
+            resume (bool): Whether to continue from an existing journal.
+                Otherwise any existing journal is replaced.
+
+        Raises:
+            ValueError: If the existing journal is for another organization.
+        """
+        if resume and os.path.exists(self.__path):
+            self.__load()
+            self.__file = open(self.__path, "a+", encoding="utf-8")
+
+            # Terminate a partially written final record of a crashed run.
+            if self.__file.tell() > 0:
+                self.__file.seek(self.__file.tell() - 1)
+                if self.__file.read(1) != "\n":
+                    self.__file.write("\n")
+        else:
+            self.__file = open(self.__path, "w", encoding="utf-8")
+            self.__write({"org": self.__organization_id})
+            self.flush()
+
+        return self
+
+    def close(self) -> None:
+        if self.__file is None:
+            return
+
+        self.flush()
+        self.__file.close()
+        self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def begin_page(self, next_param: str | None, user_ids: list[str]) -> int:
+        """Register a page of members whose users are about to be written.
+
+        Args:
+            next_param (str | None): The checkpoint of the following page, or
+                ``None`` if this is the last page.
+            user_ids (list[str]): The IDs of the users that will be written.
+
+        Returns:
+            int: The page handle to pass to `ack` and `fail`.
+        """
+        page = self.__next_page
+        self.__next_page += 1
+
+        self.__pages[page] = [next_param, set(user_ids), False]
+        self.__advance()
+
+        return page
+
+    def ack(self, page: int, user_ids: list[str]) -> None:
+        """Record users of the page as written to CAS."""
+        self.acked.update(user_ids)
+        self.__write({"acked": user_ids})
+
+        self.__pages[page][1].difference_update(user_ids)
+        self.__advance()
+
+    def fail(self, page: int, user_ids: list[str]) -> None:
+        """Record users of the page that could not be written to CAS.
+
+        The checkpoint will not move past this page, so a resumed run retries
+        these users.
+        """
+        self.__pages[page][1].difference_update(user_ids)
+        self.__pages[page][2] = True
+
+    def flush(self) -> None:
+        if not self.__buffer:
+            return
+
+        self.__file.write("".join(self.__buffer))
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__buffer.clear()
+
+    def __advance(self):
+        # Move the checkpoint past every leading page that is fully done.
+        cursor_moved = False
+        while (page := self.__pages.get(self.__head_page)) is not None:
+            next_param, pending, failed = page
+            if pending or failed:
+                break
+
+            del self.__pages[self.__head_page]
+            self.__head_page += 1
+
+            self.cursor = next_param
+            self.done = next_param is None
+            cursor_moved = True
+
+        if cursor_moved:
+            self.__write({"cursor": self.cursor, "done": self.done})
+
+    def __load(self):
+        with open(self.__path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partially written record of a crashed run.
+                    continue
+
+                if "org" in record and record["org"] != self.__organization_id:
+                    raise ValueError(
+                        f"Journal '{self.__path}' is for organization '{record['org']}', "
+                        f"not '{self.__organization_id}'"
+                    )
+
+                if "acked" in record:
+                    self.acked.update(record["acked"])
+
+                if "cursor" in record:
+                    self.cursor = record["cursor"]
+                    self.done = record["done"]
+
+    def __write(self, record):
+        self.__buffer.append(json.dumps(record, separators=(",", ":")) + "\n")
+        if len(self.__buffer) >= self.__flush_every:
+            self.flush()
@@ -0,0 +1,98 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+# Attributes of every log record, anything else was passed as `extra`.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, with the fields passed as
+    ``extra`` to the logging call.
+
+    Args:
+        fields (dict | None): Fields to add to every record, e.g. the shard
+            of the process.
+    """
+
+    def __init__(self, fields: dict | None = None):
+        super().__init__()
+        self.__fields = fields or {}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            **self.__fields,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(
+    verbosity: int = 0, /, json_format: bool = False, stream=None, fields: dict | None = None
+) -> logging.handlers.QueueListener:
+    """Send the logs of the migration to ``stream`` without blocking the
+    event loop.
+
+    Log calls only put the record on a queue, the records are formatted and
+    written by a background thread.
+
+    Args:
+        verbosity (int): ``-1`` for warnings and errors only, ``0`` for info
+            and ``1`` or more for debug messages, e.g. every CAS request.
+        json_format (bool): Whether to write JSON lines instead of text.
+        stream: The stream to write to. Defaults to stdout.
+        fields (dict | None): Fields to add to every record, e.g. the shard
+            of the process, as ``[key=value]`` in text.
+
+    Returns:
+        logging.handlers.QueueListener: The started listener, to `stop` at
+            the end of the run so that every record is written.
+    """
+    if verbosity < 0:
+        level = logging.WARNING
+    elif verbosity == 0:
+        level = logging.INFO
+    else:
+        level = logging.DEBUG
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if json_format:
+        handler.setFormatter(JsonFormatter(fields))
+    else:
+        prefix = "".join(f"[{key}={value}] " for key, value in (fields or {}).items())
+        # Escaped, as the format uses %-style placeholders.
+        prefix = prefix.replace("%", "%%")
+        handler.setFormatter(logging.Formatter(f"%(asctime)s %(levelname)-7s {prefix}%(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    # Only the migration's own debug messages, not every library's.
+    if level == logging.DEBUG:
+        for name in ("asyncio", "urllib3"):
+            logging.getLogger(name).setLevel(logging.INFO)
+
+    listener.start()
+    return listener
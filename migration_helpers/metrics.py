@@ -0,0 +1,181 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import bisect
+import contextlib
+import json
+import os
+import re
+import time
+
+# Latency bucket upper bounds in seconds, roughly 3 per decade from 1ms to 60s.
+LATENCY_BUCKETS = (
+    0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 60
+)
+
+
+class Histogram:
+    """Latency histogram with fixed buckets"""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # The last count is for observations above the largest bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket."""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p90": round(self.quantile(0.9), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6),
+            "buckets": list(self.buckets),
+            "counts": list(self.counts),
+        }
+
+    def merge(self, histogram: dict) -> None:
+        """Add the observations of a histogram in its `to_dict` form."""
+        if tuple(histogram["buckets"]) != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+
+        self.counts = [a + b for a, b in zip(self.counts, histogram["counts"])]
+        self.count += histogram["count"]
+        self.sum += histogram["sum"]
+        self.max = max(self.max, histogram["max"])
+
+
+class Metrics:
+    """Per-stage latency histograms and counters of a migration run.
+
+    Stages and counters are named with dotted names, e.g. ``cas.add_user``.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.__started = time.perf_counter()
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: dict[str, int] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if (histogram := self.histograms.get(stage)) is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    @contextlib.contextmanager
+    def timed(self, stage: str):
+        """Record the time spent in the block, including awaits, for the
+        stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def merge(self, report: dict) -> None:
+        """Add the counters and latencies of the report of another run, e.g.
+        of one shard of the migration."""
+        for counter, value in report["counters"].items():
+            self.increment(counter, value)
+
+        for stage, histogram in report["stages"].items():
+            if (own := self.histograms.get(stage)) is None:
+                own = self.histograms[stage] = Histogram(tuple(histogram["buckets"]))
+            own.merge(histogram)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.__started
+
+    def report(self) -> dict:
+        """The run report, with users/sec computed from the
+        ``users.migrated`` counter."""
+        elapsed = self.elapsed
+        return {
+            "started_at": self.started_at,
+            "elapsed_seconds": round(elapsed, 3),
+            "users_per_second": round(self.counters.get("users.migrated", 0) / elapsed, 3)
+            if elapsed
+            else 0.0,
+            "counters": dict(sorted(self.counters.items())),
+            "stages": {
+                stage: histogram.to_dict()
+                for stage, histogram in sorted(self.histograms.items())
+            },
+        }
+
+    def write_report(self, path: str) -> None:
+        """Write the run report as JSON."""
+        _write_atomic(path, json.dumps(self.report(), indent=2) + "\n")
+
+    def write_prometheus(self, path: str, /, prefix: str = "fiftyone_auth_migration") -> None:
+        """Write the metrics in the Prometheus text format, e.g. for the
+        node exporter textfile collector."""
+        lines = [
+            f"# TYPE {prefix}_elapsed_seconds gauge",
+            f"{prefix}_elapsed_seconds {self.elapsed:.3f}",
+        ]
+
+        for counter, value in sorted(self.counters.items()):
+            name = f"{prefix}_{_metric_name(counter)}_total"
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+
+        name = f"{prefix}_stage_duration_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _write_atomic(path, content):
+    # Write to a temporary file first so readers never see a partial file.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+# Metrics of the current run, shared by all stages of the pipeline.
+metrics = Metrics()
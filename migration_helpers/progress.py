@@ -0,0 +1,109 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import asyncio
+import logging
+import time
+from typing import Callable
+
+from migration_helpers.metrics import Metrics, metrics as run_metrics
+
+logger = logging.getLogger(__name__)
+
+# Counters of users that are done, whether written, skipped or failed.
+DONE_COUNTERS = ("users.migrated", "users.unchanged", "users.skipped", "users.failed")
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class ProgressReporter:
+    """Log the progress of the migration on a timer.
+
+    Progress is read from the run metrics, so counting users costs nothing
+    more than the counters that are kept anyway, and nothing is logged per
+    user.
+
+    Use as an async context manager around the migration::
+
+        async with ProgressReporter(interval=10) as progress:
+            progress.add_total(await manager.count_users())
+            ...
+
+    Args:
+        interval (float): Seconds between progress messages.
+        details (Callable[[], str] | None): Returns extra details to add to
+            each progress message.
+        metrics (Metrics): The metrics to read the progress from.
+    """
+
+    def __init__(
+        self,
+        /,
+        interval: float = 10.0,
+        details: Callable[[], str] | None = None,
+        metrics: Metrics = run_metrics,
+    ):
+        self.__interval = interval
+        self.__details = details
+        self.__metrics = metrics
+
+        self.__total: int | None = None
+        self.__started_at = 0.0
+        self.__done_at_start = 0
+        self.__task: asyncio.Task | None = None
+
+    def add_total(self, count: int) -> None:
+        """Add to the total number of users to migrate, used for the ETA."""
+        self.__total = (self.__total or 0) + count
+
+    def report(self) -> None:
+        counters = self.__metrics.counters
+        done = sum(counters.get(counter, 0) for counter in DONE_COUNTERS)
+        errors = counters.get("users.failed", 0)
+
+        elapsed = time.perf_counter() - self.__started_at
+        rate = (done - self.__done_at_start) / elapsed if elapsed > 0 else 0.0
+
+        if self.__total:
+            progress = f"{done:,}/{self.__total:,} users ({min(done / self.__total, 1):.1%})"
+            remaining = max(self.__total - done, 0)
+            eta = f", ETA {_format_duration(remaining / rate)}" if rate > 0 and remaining else ""
+        else:
+            progress, eta = f"{done:,} users", ""
+
+        details = f", {self.__details()}" if self.__details is not None else ""
+        logger.info(
+            f"Progress: {progress}, {rate:,.1f} users/s, {errors:,} errors{eta}{details}",
+            extra={
+                "done": done,
+                "total": self.__total,
+                "users_per_second": round(rate, 3),
+                "errors": errors,
+            },
+        )
+
+    async def __aenter__(self) -> "ProgressReporter":
+        counters = self.__metrics.counters
+        self.__done_at_start = sum(counters.get(counter, 0) for counter in DONE_COUNTERS)
+        self.__started_at = time.perf_counter()
+        self.__task = asyncio.create_task(self.__run())
+        return self
+
+    async def __aexit__(self, *_):
+        self.__task.cancel()
+        await asyncio.gather(self.__task, return_exceptions=True)
+        self.report()
+
+    async def __run(self):
+        while True:
+            await asyncio.sleep(self.__interval)
+            self.report()
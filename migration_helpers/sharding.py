@@ -0,0 +1,16 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import hashlib
+
+
+def shard_of(user_id: str, count: int) -> int:
+    """The shard of a user, out of ``count`` shards.
+
+    Stable across processes and runs, unlike `hash`, so that every process of
+    a sharded migration agrees on which users it owns.
+    """
+    digest = hashlib.blake2b(user_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
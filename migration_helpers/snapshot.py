@@ -0,0 +1,287 @@
+"""
+| Copyright 2017-2024, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import json
+import os
+import zlib
+from typing import Any, Iterator
+
+from fiftyone_helpers import Organization, User, UserRole
+from migration_helpers.gzip_ndjson import GZIP_WBITS, READ_SIZE, GzipNdjsonDecoder
+
+
+class SnapshotWriter:
+    """Write a snapshot of an organization, its roles and its users as gzip
+    compressed NDJSON.
+
+    The snapshot is a series of independent gzip members, "parts", so that it
+    is still a regular gzip file (e.g. ``zcat snapshot.ndjson.gz``) but can
+    also be read from the start of any part. The first part holds the
+    organization and role records, every following part up to ``part_size``
+    user records. The byte offsets of the parts are written to a sidecar
+    index, ``<path>.index.json``, which is used to split the snapshot by byte
+    range.
+
+    Users are written as they come, only the current part is buffered. The
+    snapshot is written to a temporary file and only moved into place by
+    `close`, so an interrupted export never leaves a partial snapshot behind.
+    """
+
+    def __init__(self, path: str, /, part_size: int = 10000, compresslevel: int = 6):
+        self.__path = path
+        self.__part_size = part_size
+        self.__compresslevel = compresslevel
+
+        self.__file = None
+        self.__compressor = None
+        self.__part: dict[str, int] | None = None
+        self.__parts: list[dict[str, int]] = []
+        self.__organization_id: str | None = None
+        self.__user_count = 0
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def user_count(self) -> int:
+        return self.__user_count
+
+    def open(self, organization: Organization, role_map: dict[UserRole, str]) -> "SnapshotWriter":
+        """Start the snapshot with the organization and its roles.
+
+        Args:
+            organization (Organization): The organization.
+            role_map (dict[UserRole, str]): The Auth0 ID of each role.
+        """
+        self.__file = open(f"{self.__path}.tmp", "wb")
+        self.__organization_id = organization.id
+
+        self.__begin_part()
+        self.__write({"type": "organization", "organization": dict(organization)})
+        self.__write(
+            {"type": "roles", "roles": {role.value: role_id for role, role_id in role_map.items()}}
+        )
+        self.__end_part()
+
+        return self
+
+    def write_users(self, users: list[User]) -> None:
+        for user in users:
+            if self.__part is None:
+                self.__begin_part()
+
+            # The organization is the same for every user and already in the
+            # organization record.
+            self.__write(
+                {
+                    "type": "user",
+                    "id": user.id,
+                    "email": user.email,
+                    "name": user.name,
+                    "picture": user.picture,
+                    "role": user.role.value,
+                    "group_ids": user.group_ids,
+                }
+            )
+            self.__part["users"] += 1
+            self.__user_count += 1
+
+            if self.__part["users"] >= self.__part_size:
+                self.__end_part()
+
+    def close(self) -> None:
+        """Finish the snapshot and move it and its index into place."""
+        if self.__file is None:
+            return
+
+        if self.__part is not None:
+            self.__end_part()
+
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__file.close()
+        self.__file = None
+
+        index = {
+            "organization_id": self.__organization_id,
+            "users": self.__user_count,
+            "parts": self.__parts,
+        }
+        with open(f"{self.__path}.index.json.tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+        os.replace(f"{self.__path}.tmp", self.__path)
+        os.replace(f"{self.__path}.index.json.tmp", f"{self.__path}.index.json")
+
+    def abort(self) -> None:
+        """Discard an unfinished snapshot."""
+        if self.__file is None:
+            return
+
+        self.__file.close()
+        self.__file = None
+        os.remove(f"{self.__path}.tmp")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __begin_part(self):
+        self.__compressor = zlib.compressobj(self.__compresslevel, zlib.DEFLATED, GZIP_WBITS)
+        self.__part = {"offset": self.__file.tell(), "length": 0, "users": 0}
+
+    def __end_part(self):
+        self.__file.write(self.__compressor.flush())
+        self.__part["length"] = self.__file.tell() - self.__part["offset"]
+        self.__parts.append(self.__part)
+        self.__compressor = self.__part = None
+
+    def __write(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self.__file.write(self.__compressor.compress(line.encode("utf-8")))
+
+
+class SnapshotReader:
+    """Read a snapshot written by `SnapshotWriter`.
+
+    Args:
+        path (str): The path of the snapshot.
+    """
+
+    def __init__(self, path: str):
+        self.__path = path
+
+        with open(f"{path}.index.json", encoding="utf-8") as f:
+            self.__index = json.load(f)
+
+        self.__organization: Organization | None = None
+        self.__role_map: dict[UserRole, str] | None = None
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def size(self) -> int:
+        """The size of the snapshot in bytes."""
+        last_part = self.__index["parts"][-1]
+        return last_part["offset"] + last_part["length"]
+
+    @property
+    def user_count(self) -> int:
+        return self.__index["users"]
+
+    @property
+    def organization(self) -> Organization:
+        if self.__organization is None:
+            self.__read_header()
+        return self.__organization
+
+    @property
+    def role_map(self) -> dict[UserRole, str]:
+        if self.__role_map is None:
+            self.__read_header()
+        return self.__role_map
+
+    def split(self, count: int) -> list[tuple[int, int]]:
+        """Split the user parts of the snapshot into ``count`` byte ranges of
+        about the same size.
+
+        Returns:
+            list[tuple[int, int]]: The ``(start, end)`` byte ranges, to pass
+                to `iter_user_parts`.
+        """
+        start = self.__index["parts"][1]["offset"] if len(self.__index["parts"]) > 1 else self.size
+        step = (self.size - start) / count
+        bounds = [start + round(i * step) for i in range(count)] + [self.size]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def count_users(self, /, start: int = 0, end: int | None = None) -> int:
+        """Count the users of the parts that start within a byte range, see
+        `iter_user_parts`, from the index."""
+        if end is None:
+            end = self.size
+        return sum(
+            part["users"] for part in self.__index["parts"][1:] if start <= part["offset"] < end
+        )
+
+    def iter_user_parts(
+        self, /, start: int = 0, end: int | None = None
+    ) -> Iterator[tuple[int, int, list[User]]]:
+        """Iterate over the parts of users that start within a byte range.
+
+        Each part belongs to exactly one of the ranges returned by `split`, so
+        the ranges can be read independently, e.g. by separate processes.
+
+        Args:
+            start (int): The start of the byte range, inclusive.
+            end (int | None): The end of the byte range, exclusive. Defaults
+                to the end of the snapshot.
+
+        Yields:
+            tuple[int, int, list[User]]: The offset of the part, the offset of
+                the following part, and the users of the part.
+        """
+        if end is None:
+            end = self.size
+
+        organization = self.organization
+        with open(self.__path, "rb") as f:
+            for part in self.__index["parts"][1:]:
+                if not start <= part["offset"] < end:
+                    continue
+
+                users = [
+                    _to_user(record, organization)
+                    for record in _read_part(f, part["offset"], part["length"])
+                    if record["type"] == "user"
+                ]
+                yield part["offset"], part["offset"] + part["length"], users
+
+    def __read_header(self):
+        header = self.__index["parts"][0]
+        with open(self.__path, "rb") as f:
+            for record in _read_part(f, header["offset"], header["length"]):
+                if record["type"] == "organization":
+                    self.__organization = Organization(**record["organization"])
+                elif record["type"] == "roles":
+                    self.__role_map = {
+                        UserRole(role): role_id for role, role_id in record["roles"].items()
+                    }
+
+
+def _read_part(f, offset: int, length: int) -> Iterator[dict[str, Any]]:
+    """Decompress one gzip member of the snapshot a chunk at a time."""
+    decoder = GzipNdjsonDecoder()
+    f.seek(offset)
+
+    remaining = length
+    while remaining:
+        chunk = f.read(min(READ_SIZE, remaining))
+        if not chunk:
+            raise ValueError(f"Snapshot is truncated at offset {f.tell()}")
+        remaining -= len(chunk)
+
+        yield from decoder.decode(chunk)
+
+    yield from decoder.flush()
+
+
+def _to_user(record: dict[str, Any], organization: Organization) -> User:
+    return User(
+        id=record["id"],
+        organization=organization,
+        email=record["email"],
+        name=record["name"],
+        picture=record["picture"],
+        role=record["role"],
+        group_ids=record["group_ids"],
+    )